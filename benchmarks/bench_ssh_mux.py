@@ -0,0 +1,57 @@
+"""Per-command SSH latency with and without connection multiplexing.
+
+    python benchmarks/bench_ssh_mux.py macmini --runs 10   # with tailcode installed
+
+Runs `true` on a configured device through ssh_exec, first with
+ssh.multiplex off and then on. Prints one JSON object per mode with the
+first call (which opens the master when multiplexing) and the median of
+the rest.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from tailcode.config import load_config
+from tailcode.ssh import mux_close, ssh_exec
+
+
+def time_calls(device, config, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = ssh_exec(device, config, "true")
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise SystemExit(f"ssh failed: {result.stderr.strip()}")
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("device")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    config = load_config()
+    device = config.get_device(args.device)
+    if device is None:
+        raise SystemExit(f"Device '{args.device}' not found")
+
+    for multiplex in (False, True):
+        config.ssh.multiplex = True
+        mux_close(device, config)
+        config.ssh.multiplex = multiplex
+        timings = time_calls(device, config, args.runs)
+        print(json.dumps({
+            "bench": "ssh_exec",
+            "device": device.name,
+            "multiplex": multiplex,
+            "runs": args.runs,
+            "first_s": round(timings[0], 4),
+            "median_rest_s": round(statistics.median(timings[1:] or timings), 4),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Parse time and peak memory for large `tailscale status --json` documents.
+
+    python benchmarks/bench_status_parse.py --peers 10000   # with tailcode installed
+
+Compares loading the whole document with json.load against the streaming
+snapshot parser and a hostname/online/ip projection. Prints one JSON object
+per case.
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from tailcode.jsonstream import CHUNK_SIZE, iter_members
+from tailcode.tailscale import PEER_FIELDS, TailscaleStatus, _projector
+
+
+def make_peer(i: int) -> dict:
+    host = f"ci-runner-{i:05d}"
+    return {
+        "ID": f"n{i}CNTRL",
+        "PublicKey": f"nodekey:{random.getrandbits(256):064x}",
+        "HostName": host,
+        "DNSName": f"{host}.tail1234.ts.net.",
+        "OS": random.choice(["linux", "macOS", "windows", "iOS"]),
+        "UserID": random.randint(1, 50),
+        "TailscaleIPs": [f"100.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", f"fd7a:115c:a1e0::{i:x}"],
+        "AllowedIPs": [f"100.64.{i // 256 % 256}.{i % 256}/32"],
+        "Tags": ["tag:ci"] if i % 3 else [],
+        "Addrs": [f"203.0.113.{i % 256}:41641", f"10.0.{i // 256 % 256}.{i % 256}:41641"],
+        "CurAddr": "",
+        "Relay": random.choice(["fra", "nyc", "sfo"]),
+        "RxBytes": random.randint(0, 10**9),
+        "TxBytes": random.randint(0, 10**9),
+        "Created": "2024-01-01T00:00:00Z",
+        "LastWrite": "2024-06-01T00:00:00Z",
+        "LastSeen": "2024-06-01T00:00:00Z",
+        "LastHandshake": "2024-06-01T00:00:00Z",
+        "Online": random.random() < 0.3,
+        "ExitNode": False,
+        "ExitNodeOption": False,
+        "Active": False,
+        "PeerAPIURL": [f"http://100.64.{i // 256 % 256}.{i % 256}:12345"],
+        "Capabilities": ["https://tailscale.com/cap/file-sharing"],
+        "InNetworkMap": True,
+        "InMagicSock": True,
+        "InEngine": True,
+    }
+
+
+def make_status(peers: int) -> dict:
+    return {
+        "Version": "1.70.0",
+        "BackendState": "Running",
+        "TailscaleIPs": ["100.64.0.1"],
+        "Self": make_peer(0) | {"HostName": "mac-mini", "Online": True},
+        "Peer": {f"nodekey:{i:064x}": make_peer(i) for i in range(1, peers + 1)},
+        "User": {str(u): {"ID": u, "LoginName": f"user{u}@example.com"} for u in range(1, 51)},
+    }
+
+
+def file_chunks(path: Path):
+    with open(path) as f:
+        yield from iter(lambda: f.read(CHUNK_SIZE), "")
+
+
+def parse_full(path: Path):
+    with open(path) as f:
+        return TailscaleStatus.from_json(json.load(f))
+
+
+def parse_stream(path: Path):
+    return TailscaleStatus.from_stream(file_chunks(path))
+
+
+def parse_projection(path: Path):
+    project = _projector(PEER_FIELDS, ("hostname", "online", "ip"))
+    return [project(raw) for _, _, raw in iter_members(file_chunks(path), stream_keys=("Peer",))]
+
+
+CASES = {
+    "json.load": parse_full,
+    "stream": parse_stream,
+    "stream+projection": parse_projection,
+}
+
+
+def measure(fn, path: Path, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(path)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = fn(path)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "best_s": round(min(timings), 4),
+        "peak_mib": round(peak / 2**20, 2),
+        "retained_mib": round(retained / 2**20, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--peers", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "status.json"
+        path.write_text(json.dumps(make_status(args.peers), indent=2))
+        size_mib = path.stat().st_size / 2**20
+        for name, fn in CASES.items():
+            row = {"bench": "status_parse", "case": name, "peers": args.peers, "file_mib": round(size_mib, 2)}
+            row.update(measure(fn, path, args.repeat))
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Offline stand-ins for tailscale, ssh, ntfy and the Tailscale API.
+
+`FakeFleet` writes a temp directory holding fake `tailscale` and `ssh`
+executables, their canned status output, and a config.yaml for a fleet of
+`size` servers. Commands run with `fleet.env()` and `cwd=fleet.root` see
+only the fakes:
+
+- peer 0 (`host-000`) is the wake relay and is always online
+- peer 1 (`host-001`) is the wake target; it is offline until the relay
+  runs the WoL command, after which the fakes report it online
+- the other peers alternate between online and offline
+
+Every fake call sleeps `latency_ms` first. The fakes are shell scripts, so
+they add only a fork/exec on top of that.
+"""
+import json
+import os
+import socket
+import stat
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import yaml
+
+RELAY = "host-000"
+TARGET = "host-001"
+
+TAILSCALE_SCRIPT = """#!/bin/sh
+[ -n "$FAKE_LATENCY" ] && sleep "$FAKE_LATENCY"
+for last; do :; done
+case "$1" in
+  status)
+    if [ -f "$FAKE_DIR/woken" ]; then cat "$FAKE_DIR/status-woken.json"; else cat "$FAKE_DIR/status.json"; fi ;;
+  ip) echo 100.64.0.1 ;;
+  ssh)
+    case "$last" in
+      *sendto*) touch "$FAKE_DIR/woken"; echo sent ;;
+      "echo ok") echo ok ;;
+    esac ;;
+  nc) exit 1 ;;
+esac
+exit 0
+"""
+
+# No ControlMaster is ever running, so `-O check` reports none.
+SSH_SCRIPT = """#!/bin/sh
+[ -n "$FAKE_LATENCY" ] && sleep "$FAKE_LATENCY"
+for last; do :; done
+case " $* " in *" -O "*) exit 255 ;; esac
+case "$last" in
+  *sendto*) touch "$FAKE_DIR/woken"; echo sent ;;
+  "echo ok") echo ok ;;
+esac
+exit 0
+"""
+
+# Runs the CLI with the probe's SSH port pointed at BannerServer, since a
+# benchmark can't count on binding port 22.
+CLI_SHIM = """import os
+import tailcode.probe
+tailcode.probe.SSH_PORT = int(os.environ["FAKE_SSH_PORT"])
+from tailcode.cli import app
+app(prog_name="tc")
+"""
+
+
+def _peer(i: int, online: bool) -> dict:
+    host = f"host-{i:03d}"
+    return {
+        "HostName": host,
+        "DNSName": f"{host}.bench.ts.net.",
+        "OS": "macOS",
+        "Online": online,
+        # Probes connect to the first IP, so the target must be local.
+        "TailscaleIPs": ["127.0.0.1" if host == TARGET else f"100.64.{i // 256}.{i % 256}"],
+    }
+
+
+def _status(size: int, woken: bool) -> dict:
+    peers = {}
+    for i in range(size):
+        host = f"host-{i:03d}"
+        if host == RELAY:
+            online = True
+        elif host == TARGET:
+            online = woken
+        else:
+            online = i % 2 == 0
+        peers[f"nodekey:{i:064x}"] = _peer(i, online)
+    return {
+        "Self": {"HostName": "bench-client", "DNSName": "bench-client.bench.ts.net.", "Online": True},
+        "Peer": peers,
+    }
+
+
+class FakeFleet:
+    def __init__(self, root: Path, size: int, latency_ms: float = 0.0, ntfy_url: str = ""):
+        self.root = root
+        self.size = size
+        self.latency_ms = latency_ms
+        self.ntfy_url = ntfy_url
+        self.ssh_port = 0
+
+    def write(self) -> "FakeFleet":
+        bin_dir = self.root / "bin"
+        bin_dir.mkdir(parents=True, exist_ok=True)
+        for name, script in (("tailscale", TAILSCALE_SCRIPT), ("ssh", SSH_SCRIPT)):
+            path = bin_dir / name
+            path.write_text(script)
+            path.chmod(path.stat().st_mode | stat.S_IEXEC)
+        (self.root / "tc.py").write_text(CLI_SHIM)
+        (self.root / "status.json").write_text(json.dumps(_status(self.size, woken=False)))
+        (self.root / "status-woken.json").write_text(json.dumps(_status(self.size, woken=True)))
+        (self.root / "config.yaml").write_text(yaml.safe_dump(self.config()))
+        (self.root / "home").mkdir(exist_ok=True)
+        return self
+
+    def config(self) -> dict:
+        devices = {
+            f"host-{i:03d}": {
+                "hostname": f"host-{i:03d}",
+                "mac": f"02:00:00:00:{i // 256:02x}:{i % 256:02x}",
+                "user": "bench",
+                "role": "server",
+                "location": "lab",
+            }
+            for i in range(self.size)
+        }
+        return {
+            "locations": {"lab": {"name": "Lab", "wake_relay": RELAY}},
+            "devices": devices,
+            "notifications": {
+                "provider": "ntfy",
+                "ntfy": {"server": self.ntfy_url or "http://127.0.0.1:9", "topic": "bench"},
+            },
+            "ssh": {"use_tailscale_ssh": True, "session_name": "bench"},
+            "preferences": {"default_device": TARGET, "auto_wake": True, "wake_cooldown": 0},
+        }
+
+    def env(self, **extra: str) -> dict:
+        env = dict(os.environ)
+        env.update({
+            "PATH": f"{self.root / 'bin'}{os.pathsep}{env.get('PATH', '')}",
+            "HOME": str(self.root / "home"),
+            "XDG_CACHE_HOME": str(self.root / "home" / ".cache"),
+            "TAILCODE_TAILSCALED_SOCKET": str(self.root / "no-tailscaled.sock"),
+            "FAKE_DIR": str(self.root),
+            "FAKE_LATENCY": f"{self.latency_ms / 1000:.4f}" if self.latency_ms else "",
+            "FAKE_SSH_PORT": str(self.ssh_port),
+        })
+        env.update(extra)
+        return env
+
+    def tc(self, *args: str) -> list[str]:
+        return [sys.executable, str(self.root / "tc.py"), *args]
+
+    def reset_wake(self) -> None:
+        """Put the target back to sleep and forget recent wakes and status."""
+        (self.root / "woken").unlink(missing_ok=True)
+        cache = self.root / "home" / ".cache" / "tailcode"
+        for path in [cache / "status.json", *cache.glob("wakes/*.json")]:
+            path.unlink(missing_ok=True)
+
+
+class BannerServer:
+    """Accepts TCP connections and sends an SSH banner, standing in for sshd."""
+
+    def __init__(self):
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def start(self) -> "BannerServer":
+        self._thread.start()
+        return self
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.sendall(b"SSH-2.0-OpenSSH_9.6 bench\r\n")
+                except OSError:
+                    pass
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class _Quiet(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, body: bytes = b"", headers: dict | None = None) -> None:
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockServer:
+    """ThreadingHTTPServer on an ephemeral local port, run in a daemon thread."""
+
+    handler: type[BaseHTTPRequestHandler]
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler)
+        self.server.daemon_threads = True
+        self.server.mock = self
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def count(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _NtfyHandler(_Quiet):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.mock.count()
+        self._reply(200, b'{"id":"bench"}', {"Content-Type": "application/json"})
+
+
+class MockNtfy(MockServer):
+    handler = _NtfyHandler
+
+
+class _ApiHandler(_Quiet):
+    def do_GET(self):
+        mock = self.server.mock
+        mock.count()
+        if not self.path.endswith("/devices"):
+            self._reply(404)
+        elif self.headers.get("If-None-Match") == mock.etag:
+            self._reply(304, headers={"ETag": mock.etag})
+        else:
+            self._reply(200, mock.body, {"ETag": mock.etag, "Content-Type": "application/json"})
+
+
+class MockTailscaleAPI(MockServer):
+    """Serves GET /tailnet/<tailnet>/devices for `size` devices, with an ETag."""
+
+    handler = _ApiHandler
+
+    def __init__(self, size: int):
+        super().__init__()
+        devices = [
+            {
+                "id": str(i),
+                "name": f"host-{i:03d}.bench.ts.net",
+                "hostname": f"host-{i:03d}",
+                "addresses": [f"100.64.{i // 256}.{i % 256}"],
+                "os": "macOS",
+                "online": i % 2 == 0,
+                "lastSeen": "2026-01-01T00:00:00Z",
+                "tags": [],
+            }
+            for i in range(size)
+        ]
+        self.body = json.dumps({"devices": devices}).encode()
+        self.etag = f'"bench-{size}"'
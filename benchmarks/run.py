@@ -0,0 +1,202 @@
+"""End-to-end timings of tc commands against fake tailscale/ssh and mock HTTP servers.
+
+    python benchmarks/run.py                                  # with tailcode installed
+    python benchmarks/run.py --fleet 10,100 --latency-ms 20 --only status,connect
+    python benchmarks/run.py --out results.jsonl              # append, to compare commits
+
+Everything runs offline, against benchmarks/fakes.py. Each case prints one
+JSON object with times in milliseconds, tagged with the git commit, so
+results from different checkouts can be diffed directly.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from fakes import TARGET, BannerServer, FakeFleet, MockNtfy, MockTailscaleAPI
+
+BENCHES = ("status", "connect", "discover", "api", "webhook")
+WEBHOOK_TOKEN = "bench-token"
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "runs": len(samples),
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "min_ms": round(min(samples) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        )
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def time_command(fleet: FakeFleet, args: list[str], runs: int, before=None) -> list[float]:
+    """Wall time of `tc <args>` per run, after one discarded warm-up run."""
+    timings = []
+    for i in range(runs + 1):
+        if before:
+            before()
+        start = time.perf_counter()
+        result = subprocess.run(
+            fleet.tc(*args), cwd=fleet.root, env=fleet.env(), capture_output=True, text=True
+        )
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            raise SystemExit(f"tc {' '.join(args)} failed:\n{result.stdout}{result.stderr}")
+        if i:
+            timings.append(elapsed)
+    return timings
+
+
+def bench_status(fleet, args) -> dict:
+    return summarize(time_command(fleet, ["status"], args.runs))
+
+
+def bench_connect(fleet, args) -> dict:
+    """Offline target: status, relay wake, notify, readiness probes, ssh."""
+    return summarize(
+        time_command(fleet, ["connect", TARGET, "--no-session"], args.runs, before=fleet.reset_wake)
+    )
+
+
+def bench_discover(fleet, args) -> dict:
+    return summarize(time_command(fleet, ["discover", "--show"], args.runs))
+
+
+def bench_api(fleet, args) -> dict:
+    """Device listing from the mock control-plane API: cold, then ETag revalidation."""
+    from tailcode.config import Config
+    from tailcode.tailscale import TailscaleAPI
+
+    mock = MockTailscaleAPI(fleet.size).start()
+    cold, revalidate = [], []
+    try:
+        for _ in range(args.runs):
+            with TailscaleAPI(Config(), base_url=mock.url, max_age=0) as api:
+                start = time.perf_counter()
+                api.list_devices(refresh=True)
+                cold.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                api.list_devices(refresh=True)
+                revalidate.append(time.perf_counter() - start)
+    finally:
+        mock.close()
+    return {"cold": summarize(cold), "revalidate": summarize(revalidate)}
+
+
+def _start_webhook(fleet: FakeFleet) -> tuple[subprocess.Popen, str]:
+    import socket
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen(
+        fleet.tc("serve", "--port", str(port), "--dry-run"),
+        cwd=fleet.root,
+        env=fleet.env(TAILCODE_TOKEN=WEBHOOK_TOKEN),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{url}/health", timeout=1)
+            return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    proc.kill()
+    raise SystemExit("webhook server did not start")
+
+
+def bench_webhook(fleet, args) -> dict:
+    """Throughput and latency of a `tc serve --dry-run` under the default request mix."""
+    from tailcode.loadgen import DEFAULT_MIX, parse_mix, run_load
+
+    proc, url = _start_webhook(fleet)
+    try:
+        result = run_load(
+            url,
+            parse_mix(DEFAULT_MIX),
+            concurrency=args.concurrency,
+            duration=args.duration,
+            token=WEBHOOK_TOKEN,
+            device=TARGET,
+        )
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    del result["url"]
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fleet", default="10,100,1000", help="Comma-separated fleet sizes")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Added to every fake call")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--only", default=",".join(BENCHES), help="Comma-separated benches")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of webhook load")
+    parser.add_argument("--concurrency", type=int, default=8, help="Webhook client threads")
+    parser.add_argument("--out", type=Path, help="Also append results to this file")
+    args = parser.parse_args()
+
+    selected = [b.strip() for b in args.only.split(",") if b.strip()]
+    unknown = set(selected) - set(BENCHES)
+    if unknown:
+        raise SystemExit(f"Unknown bench: {', '.join(sorted(unknown))} (choose from {', '.join(BENCHES)})")
+
+    meta = {"commit": git_commit(), "python": platform.python_version(), "latency_ms": args.latency_ms}
+    runners = {
+        "status": bench_status,
+        "connect": bench_connect,
+        "discover": bench_discover,
+        "api": bench_api,
+        "webhook": bench_webhook,
+    }
+    out = args.out.open("a") if args.out else None
+    ntfy = MockNtfy().start()
+    banner = BannerServer().start()
+    try:
+        for size in (int(n) for n in args.fleet.split(",")):
+            with tempfile.TemporaryDirectory(prefix="tc-bench-") as tmp:
+                fleet = FakeFleet(Path(tmp), size, args.latency_ms, ntfy_url=ntfy.url).write()
+                fleet.ssh_port = banner.port
+                for name in selected:
+                    line = json.dumps({"bench": name, "fleet": size, **runners[name](fleet, args), **meta})
+                    print(line, flush=True)
+                    if out:
+                        out.write(line + "\n")
+    finally:
+        banner.close()
+        ntfy.close()
+        if out:
+            out.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
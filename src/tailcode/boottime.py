@@ -0,0 +1,118 @@
+"""Per-device wake-to-ready history, used to schedule readiness probes."""
+import json
+import math
+import os
+
+from tailcode.cache import get_cache_dir
+
+BOOT_TIMES_FILE = "boot_times.json"
+# Waits that timed out, kept apart from real boot times.
+TIMEOUTS_FILE = "boot_timeouts.json"
+MAX_SAMPLES = 20
+MAX_TIMEOUTS = 5
+DEFAULT_TIMEOUT = 60.0
+MAX_TIMEOUT = 300.0
+# Extra time granted, up to MAX_TIMEOUT, while a device is on the network
+# but not yet accepting logins.
+EXTEND_TIMEOUT = 30.0
+# With no history, keep the old fixed poll interval.
+DEFAULT_DELAY = 3.0
+DENSE_DELAY = 1.0
+MAX_DELAY = 5.0
+
+
+def _load_all(filename: str = BOOT_TIMES_FILE) -> dict[str, list[float]]:
+    try:
+        data = json.loads((get_cache_dir() / filename).read_text())
+        return {k: [float(x) for x in v] for k, v in data.items()}
+    except (OSError, ValueError, TypeError, AttributeError):
+        return {}
+
+
+def _save_all(filename: str, data: dict[str, list[float]]) -> None:
+    path = get_cache_dir() / filename
+    tmp = path.with_suffix(".tmp")
+    try:
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def load_boot_times(device_name: str) -> list[float]:
+    return _load_all().get(device_name, [])
+
+
+def load_timeouts(device_name: str) -> list[float]:
+    return _load_all(TIMEOUTS_FILE).get(device_name, [])
+
+
+def record_boot_time(device_name: str, seconds: float) -> None:
+    """Add a sample, and forget the timeouts it supersedes."""
+    data = _load_all()
+    samples = data.get(device_name, [])
+    samples.append(round(seconds, 1))
+    data[device_name] = samples[-MAX_SAMPLES:]
+    _save_all(BOOT_TIMES_FILE, data)
+    timeouts = _load_all(TIMEOUTS_FILE)
+    if timeouts.pop(device_name, None) is not None:
+        _save_all(TIMEOUTS_FILE, timeouts)
+
+
+def record_timeout(device_name: str, seconds: float) -> None:
+    """Note a wait that gave up after `seconds`.
+
+    That's only a lower bound on the boot time, so it's kept out of the
+    samples; it just makes the next wait longer.
+    """
+    data = _load_all(TIMEOUTS_FILE)
+    timeouts = data.get(device_name, [])
+    timeouts.append(round(seconds, 1))
+    data[device_name] = timeouts[-MAX_TIMEOUTS:]
+    _save_all(TIMEOUTS_FILE, data)
+
+
+def percentile(samples: list[float], p: float) -> float:
+    """Nearest-rank percentile; `samples` must be non-empty."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class BootModel:
+    """When a woken device is likely to be ready, learned from past wakes.
+
+    Probes are spaced out before the earliest plausible ready time, dense
+    (every second) until the 95th percentile, then back off. Waits that
+    timed out since the last successful one only lengthen the timeout.
+    """
+
+    def __init__(self, samples: list[float], timeouts: list[float] | None = None):
+        self.samples = samples
+        self.timeouts = timeouts or []
+
+    @classmethod
+    def for_device(cls, device_name: str) -> "BootModel":
+        return cls(load_boot_times(device_name), load_timeouts(device_name))
+
+    def timeout(self) -> float:
+        timeout = DEFAULT_TIMEOUT
+        if self.samples:
+            timeout = max(timeout, percentile(self.samples, 95) * 1.5)
+        if self.timeouts:
+            # Last time that wasn't long enough; give it a bit more.
+            timeout = max(timeout, max(self.timeouts) + EXTEND_TIMEOUT)
+        return min(MAX_TIMEOUT, timeout)
+
+    def next_delay(self, elapsed: float) -> float:
+        if not self.samples:
+            return DEFAULT_DELAY
+        early = percentile(self.samples, 10) * 0.8
+        late = percentile(self.samples, 95)
+        if elapsed < early:
+            # Sleep straight to the start of the window if it's close,
+            # otherwise check in a few times on the way.
+            return max(DENSE_DELAY, min(early - elapsed, max(DEFAULT_DELAY, early / 3)))
+        if elapsed < late:
+            return DENSE_DELAY
+        return min(MAX_DELAY, DENSE_DELAY + (elapsed - late) / 10)
@@ -0,0 +1,51 @@
+"""On-disk cache of the last tailscale status snapshot."""
+import json
+import os
+from pathlib import Path
+
+from tailcode.tailscale import TailscaleStatus, get_status_snapshot
+
+STATUS_CACHE_FILE = "status.json"
+
+
+def get_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME")
+    cache_dir = (Path(base) if base else Path.home() / ".cache") / "tailcode"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def load_cached_status() -> TailscaleStatus | None:
+    """Return the last saved snapshot, however old, or None if there isn't one."""
+    path = get_cache_dir() / STATUS_CACHE_FILE
+    try:
+        return TailscaleStatus.from_dict(json.loads(path.read_text()))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def save_cached_status(snapshot: TailscaleStatus) -> None:
+    if not snapshot.available:
+        return
+    path = get_cache_dir() / STATUS_CACHE_FILE
+    tmp = path.with_suffix(".tmp")
+    try:
+        tmp.write_text(json.dumps(snapshot.to_dict()))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def refresh_status() -> TailscaleStatus:
+    """Fetch a fresh snapshot from tailscale and write it to the cache."""
+    snapshot = get_status_snapshot()
+    save_cached_status(snapshot)
+    return snapshot
+
+
+def get_status(ttl: float) -> TailscaleStatus:
+    """Return the cached snapshot if it is younger than `ttl` seconds, else refresh."""
+    cached = load_cached_status()
+    if cached is not None and cached.age <= ttl:
+        return cached
+    return refresh_status()
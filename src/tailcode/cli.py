@@ -1,4 +1,6 @@
+import json
 import time
+from contextlib import contextmanager
 from pathlib import Path
 
 import typer
@@ -11,15 +13,62 @@ console = Console()
 
 def get_config():
     from tailcode.config import load_config
-    return load_config()
 
+    try:
+        return load_config()
+    except ValueError as e:
+        console.print(f"[red]Config error: {e}[/red]")
+        raise typer.Exit(1)
 
-@app.command()
-def status():
-    """Show all devices and their online status."""
-    from tailcode.tailscale import is_peer_online
 
-    config = get_config()
+@app.callback()
+def main(
+    profile: bool = typer.Option(
+        False, "--profile", help="Report subprocess and HTTP calls on exit (or TAILCODE_PROFILE=1)"
+    ),
+):
+    """Connect to any device, anywhere"""
+    from tailcode.profiling import enabled_from_env
+
+    if profile or enabled_from_env():
+        import atexit
+
+        from tailcode.profiling import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        atexit.register(_print_profile, profiler)
+
+
+def _print_profile(profiler) -> None:
+    profiler.stop()
+    err = Console(stderr=True)
+    table = Table(title=f"Profile: {profiler.wall_time:.2f}s wall, {len(profiler.calls)} calls")
+    table.add_column("Kind", style="dim")
+    table.add_column("Call", style="cyan")
+    table.add_column("Count", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("Total", justify="right")
+    table.add_column("Max", justify="right")
+    for row in profiler.summary():
+        table.add_row(
+            row["kind"],
+            row["group"],
+            str(row["calls"]),
+            str(row["failed"]) if row["failed"] else "",
+            f"{row['total'] * 1000:.0f} ms",
+            f"{row['max'] * 1000:.0f} ms",
+        )
+    err.print(table)
+
+    slowest = sorted(profiler.calls, key=lambda c: c.duration, reverse=True)[:10]
+    if slowest:
+        err.print("[dim]Slowest calls:[/dim]")
+        for call in slowest:
+            err.print(f"  {call.duration * 1000:7.0f} ms  {call.target}", markup=False, highlight=False)
+
+
+def _status_table(config, snapshot, stale: bool = False) -> Table:
     table = Table(title="Devices")
     table.add_column("Name", style="cyan")
     table.add_column("Host", style="dim")
@@ -28,12 +77,38 @@ def status():
     table.add_column("WoL")
 
     for name, device in config.devices.items():
-        online = is_peer_online(device.hostname)
+        online = snapshot.is_online(device.hostname)
         status_str = "[green]online[/green]" if online else "[dim]offline[/dim]"
+        if stale:
+            status_str += " [yellow]?[/yellow]"
         wol_str = "[green]yes[/green]" if device.can_wake else "[dim]no[/dim]"
         table.add_row(name, device.hostname, device.role, status_str, wol_str)
 
-    console.print(table)
+    if stale:
+        table.caption = f"[yellow]cached {snapshot.age:.0f}s ago, refreshing...[/yellow]"
+    return table
+
+
+@app.command()
+def status():
+    """Show all devices and their online status."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from rich.live import Live
+
+    from tailcode.cache import load_cached_status, refresh_status
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(refresh_status)
+        config = get_config()
+        cached = load_cached_status()
+
+        if cached is None or not console.is_terminal:
+            console.print(_status_table(config, pending.result()))
+            return
+
+        with Live(_status_table(config, cached, stale=True), console=console, auto_refresh=False) as live:
+            live.update(_status_table(config, pending.result()), refresh=True)
 
 
 @app.command()
@@ -41,11 +116,13 @@ def connect(
     device_name: str = typer.Argument(None, help="Device to connect to"),
     no_session: bool = typer.Option(False, "--no-session", "-n", help="Don't attach tmux"),
     wake: bool = typer.Option(True, "--wake/--no-wake", "-w/-W", help="Auto-wake if offline"),
+    timing: bool = typer.Option(False, "--timing", help="Show where the time went"),
+    timing_json: Path = typer.Option(None, "--timing-json", help="Write the timeline as JSON to a file"),
 ):
     """Connect to a device. Auto-wakes if needed."""
-    from tailcode.ssh import is_reachable, ssh_connect
-    from tailcode.tailscale import is_peer_online
+    from tailcode.ssh import ssh_connect
 
+    started = time.monotonic()
     config = get_config()
 
     if device_name is None:
@@ -65,14 +142,18 @@ def connect(
         console.print(f"[red]{device_name} is a client device, can't connect to it[/red]")
         raise typer.Exit(1)
 
-    if not is_peer_online(device.hostname):
-        if wake and device.can_wake:
-            console.print(f"[yellow]{device_name} offline, waking...[/yellow]")
-            _do_wake(device, config)
-            _wait_for_device(device, config, timeout=60)
-        else:
-            console.print(f"[red]{device_name} is offline[/red]")
-            raise typer.Exit(1)
+    with _timing(timing, timing_json):
+        snapshot = _connect_snapshot(device, config)
+        woke = not snapshot.is_online(device.hostname)
+        if woke:
+            if wake and device.can_wake:
+                console.print(f"[yellow]{device_name} offline, waking...[/yellow]")
+                _do_wake(device, config, snapshot=snapshot)
+                _wait_for_device(device, config)
+            else:
+                console.print(f"[red]{device_name} is offline[/red]")
+                raise typer.Exit(1)
+        _record_connect(device, started, woke)
 
     console.print(f"Connecting to [cyan]{device_name}[/cyan]...")
     exit_code = ssh_connect(device, config, with_session=not no_session)
@@ -80,7 +161,11 @@ def connect(
 
 
 @app.command()
-def wake(device_name: str = typer.Argument(..., help="Device to wake")):
+def wake(
+    device_name: str = typer.Argument(..., help="Device to wake"),
+    timing: bool = typer.Option(False, "--timing", help="Show where the time went"),
+    timing_json: Path = typer.Option(None, "--timing-json", help="Write the timeline as JSON to a file"),
+):
     """Send Wake-on-LAN to a device."""
     config = get_config()
     device = config.get_device(device_name)
@@ -89,13 +174,19 @@ def wake(device_name: str = typer.Argument(..., help="Device to wake")):
         console.print(f"[red]Device '{device_name}' not found[/red]")
         raise typer.Exit(1)
 
-    _do_wake(device, config)
+    with _timing(timing, timing_json):
+        _do_wake(device, config)
 
 
 @app.command()
 def run(
     device_name: str = typer.Argument(..., help="Device to run command on"),
     command: str = typer.Argument(..., help="Command to execute"),
+    detach: bool = typer.Option(
+        False, "--detach", "-d", help="Run in a tmux window and notify when it finishes"
+    ),
+    name: str | None = typer.Option(None, "--name", "-n", help="Job name (with --detach)"),
+    tail: int = typer.Option(15, "--tail", help="Lines of output in the completion notification"),
 ):
     """Run a command on a device."""
     from tailcode.ssh import ssh_exec
@@ -107,6 +198,17 @@ def run(
         console.print(f"[red]Device '{device_name}' not found[/red]")
         raise typer.Exit(1)
 
+    if detach:
+        from tailcode.remotejobs import job_name, start_job
+
+        result = start_job(device, config, command, name or job_name(command), tail_lines=tail)
+        if not result["ok"]:
+            console.print(f"[red]{result['error']}[/red]")
+            raise typer.Exit(1)
+        console.print(f"[green]Started job {result['name']} on {device.name}[/green]")
+        console.print(f"[dim]tc jobs {device.name} --attach {result['name']}[/dim]")
+        return
+
     result = ssh_exec(device, config, command)
     if result.stdout:
         console.print(result.stdout, end="")
@@ -115,35 +217,373 @@ def run(
     raise typer.Exit(result.returncode)
 
 
+@app.command()
+def jobs(
+    device_name: str | None = typer.Argument(None, help="Device (default: default device)"),
+    attach: str | None = typer.Option(None, "--attach", "-a", help="Attach to a running job"),
+    log: str | None = typer.Option(None, "--log", "-l", help="Print the end of a job's output"),
+    lines: int = typer.Option(50, "--lines", help="Lines shown by --log"),
+    clear: bool = typer.Option(False, "--clear", help="Forget finished jobs"),
+    as_json: bool = typer.Option(False, "--json", help="Print jobs as JSON"),
+):
+    """List detached jobs started with `tc run --detach`."""
+    from tailcode.remotejobs import attach_job, clear_jobs, job_log, list_jobs, valid_name
+
+    config = get_config()
+    device = config.get_device(device_name) if device_name else config.get_default_device()
+    if not device:
+        console.print(f"[red]Device '{device_name or 'default'}' not found[/red]")
+        raise typer.Exit(1)
+
+    for job in (attach, log):
+        if job is not None and not valid_name(job):
+            console.print(f"[red]Invalid job name: {job}[/red]")
+            raise typer.Exit(1)
+    if attach:
+        raise typer.Exit(attach_job(device, config, attach))
+    if log:
+        result = job_log(device, config, log, lines)
+        if result.returncode != 0:
+            console.print(f"[red]No output for job {log}[/red]")
+            raise typer.Exit(1)
+        print(result.stdout, end="")
+        return
+    if clear:
+        clear_jobs(device, config)
+
+    found = list_jobs(device, config)
+    if found is None:
+        console.print(f"[red]Couldn't reach {device.name}[/red]")
+        raise typer.Exit(1)
+    if as_json:
+        print(json.dumps([job.to_dict() for job in found]))
+        return
+    if not found:
+        console.print(f"[dim]No jobs on {device.name}[/dim]")
+        return
+
+    table = Table(title=f"Jobs on {device.name}")
+    table.add_column("Name", style="cyan")
+    table.add_column("State")
+    table.add_column("Started")
+    table.add_column("Command", style="dim")
+    for job in found:
+        if job.state == "running":
+            state = "[yellow]running[/yellow]"
+        elif job.state == "lost":
+            state = "[red]lost[/red]"
+        elif job.exit_code == 0:
+            state = "[green]done[/green]"
+        else:
+            state = f"[red]exit {job.exit_code}[/red]"
+        started = time.strftime("%m-%d %H:%M", time.localtime(job.started)) if job.started else "-"
+        table.add_row(job.name, state, started, job.command)
+    console.print(table)
+
+
+@app.command("probe")
+def probe_device(
+    device_name: str = typer.Argument(..., help="Device to probe"),
+    until: str = typer.Option("login", "--until", help="Last stage: tailscale, tcp, banner or login"),
+    as_json: bool = typer.Option(False, "--json", help="Print the result as JSON"),
+):
+    """Check how far a device is reachable, with per-stage timings."""
+    from tailcode.probe import STAGES, probe
+
+    if until not in STAGES:
+        console.print(f"[red]Unknown stage: {until}[/red] (choose from {', '.join(STAGES)})")
+        raise typer.Exit(1)
+
+    config = get_config()
+    device = config.get_device(device_name)
+    if not device:
+        console.print(f"[red]Device '{device_name}' not found[/red]")
+        raise typer.Exit(1)
+
+    result = probe(device, config, until=until)
+    if as_json:
+        print(json.dumps(result.to_dict()))
+    else:
+        table = Table(title=f"Probe {device.name}")
+        table.add_column("Stage", style="cyan")
+        table.add_column("Result")
+        table.add_column("Time", justify="right")
+        table.add_column("Detail", style="dim")
+        for stage in result.stages:
+            ok = "[green]ok[/green]" if stage.ok else "[red]fail[/red]"
+            table.add_row(stage.name, ok, f"{stage.duration * 1000:.0f} ms", stage.detail)
+        console.print(table)
+    raise typer.Exit(0 if result.ok else 1)
+
+
+@app.command()
+def mux(
+    close: bool = typer.Option(False, "--close", "-c", help="Close all shared connections"),
+):
+    """Show or close shared SSH connections used by run, probes and relay wakes."""
+    from tailcode.ssh import mux_close, mux_is_open
+
+    config = get_config()
+    if not config.ssh.multiplex:
+        console.print("[dim]SSH multiplexing is disabled (ssh.multiplex: false)[/dim]")
+        return
+
+    table = Table(title="Shared SSH connections")
+    table.add_column("Name", style="cyan")
+    table.add_column("Host", style="dim")
+    table.add_column("Connection")
+
+    for device in config.get_servers():
+        is_open = mux_is_open(device, config)
+        if is_open and close:
+            state = "[yellow]closed[/yellow]" if mux_close(device, config) else "[red]close failed[/red]"
+        else:
+            state = "[green]open[/green]" if is_open else "[dim]none[/dim]"
+        table.add_row(device.name, device.hostname, state)
+
+    console.print(table)
+
+
+@app.command()
+def stats(
+    days: int = typer.Option(30, "--days", "-d", help="How far back to look"),
+    as_json: bool = typer.Option(False, "--json", help="Print the summary as JSON"),
+):
+    """Show wake, ready and connect latency per device, and relay success rates."""
+    from tailcode.telemetry import summarize
+
+    summary = summarize(time.time() - days * 86400)
+    if as_json:
+        print(json.dumps(summary))
+        return
+    if not summary["devices"] and not summary["relays"]:
+        console.print(f"[dim]No events recorded in the last {days} days[/dim]")
+        return
+
+    def cell(latency) -> str:
+        if latency is None:
+            return "[dim]-[/dim]"
+        return f"{latency['p50']:.2f}s / {latency['p95']:.2f}s [dim]({latency['count']})[/dim]"
+
+    table = Table(title=f"Latency p50 / p95, last {days} days")
+    table.add_column("Device", style="cyan")
+    table.add_column("Wake sent")
+    table.add_column("Wake to ready")
+    table.add_column("Connect")
+    for name, kinds in summary["devices"].items():
+        table.add_row(name, cell(kinds["wake"]), cell(kinds["ready"]), cell(kinds["connect"]))
+    console.print(table)
+
+    if summary["relays"]:
+        table = Table(title="Wake relays")
+        table.add_column("Relay", style="cyan")
+        table.add_column("Attempts", justify="right")
+        table.add_column("Success", justify="right")
+        for relay, counts in summary["relays"].items():
+            table.add_row(relay, str(counts["attempts"]), f"{counts['rate']:.0%}")
+        console.print(table)
+
+
 @app.command()
 def notify(
-    message: str = typer.Argument(..., help="Message to send"),
+    message: str | None = typer.Argument(None, help="Message to send"),
     title: str = typer.Option("Tailcode", "--title", "-t"),
+    stdin: bool = typer.Option(False, "--stdin", help="Send matching lines read from stdin"),
+    match: list[str] | None = typer.Option(
+        None, "--match", "-m", help="Regex a line must match (repeatable; default from config)"
+    ),
+    tee: bool = typer.Option(False, "--tee", help="With --stdin, echo input to stdout"),
 ):
     """Send a push notification."""
-    from tailcode.notify import notify as send_notify
+    from tailcode.notify import deliver
 
     config = get_config()
-    success = send_notify(message, title=title, config=config)
-    if success:
+    if stdin:
+        _notify_stream(config, title, match or None, tee)
+        return
+    if message is None:
+        console.print("[red]Give a message, or --stdin[/red]")
+        raise typer.Exit(1)
+    delivery = deliver(message, title=title, config=config)
+    if len(delivery.attempts) > 1:
+        for attempt in delivery.attempts:
+            if attempt.duration is None:
+                gave_up = "timed out" if config.notifications.policy == "failover" else "cancelled"
+                console.print(f"  [dim]{attempt.provider}: {gave_up}[/dim]")
+            else:
+                mark = "[green]ok[/green]" if attempt.ok else "[red]failed[/red]"
+                console.print(f"  {attempt.provider}: {mark} in {attempt.duration * 1000:.0f} ms")
+    if delivery.ok:
         console.print("[green]Sent[/green]")
     else:
         console.print("[red]Failed[/red]")
         raise typer.Exit(1)
 
 
+def _notify_stream(config, title: str, patterns: list[str] | None, tee: bool) -> None:
+    import re
+    import sys
+
+    from tailcode.notify import get_dispatcher
+    from tailcode.streamnotify import StreamNotifier
+
+    try:
+        notifier = StreamNotifier(config, patterns=patterns, title=title)
+    except re.error as e:
+        console.print(f"[red]Bad pattern: {e}[/red]")
+        raise typer.Exit(1)
+
+    def echo(line: str) -> None:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+    try:
+        notifier.follow(sys.stdin, echo=echo if tee else None)
+    except KeyboardInterrupt:
+        notifier.close()
+    delivered = get_dispatcher().flush()
+    err = Console(stderr=True)
+    err.print(f"[dim]{notifier.matched} matching lines, {notifier.sent} notifications[/dim]")
+    if not delivered:
+        err.print("[yellow]Some notifications are still queued for retry[/yellow]")
+
+
 @app.command()
 def serve(
     port: int = typer.Option(8765, "--port", "-p"),
+    workers: int = typer.Option(8, "--workers", help="Concurrent request workers"),
+    action_workers: int = typer.Option(
+        8, "--action-workers", help="Wakes and notifications run at once, async jobs included"
+    ),
+    timeout: float = typer.Option(20.0, "--timeout", help="Seconds before a slow request gets a 504"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Fake /wake and /notify, for load testing"),
 ):
     """Start webhook server for Shortcuts."""
     from tailcode.webhook import run_server
 
     console.print(f"Webhook server on [cyan]:{port}[/cyan]")
+    if dry_run:
+        console.print("[yellow]Dry run: /wake and /notify don't send anything[/yellow]")
     console.print("POST /wake   {\"device\": \"name\"}")
     console.print("POST /status")
     console.print("GET  /health")
-    run_server("0.0.0.0", port)
+    run_server(
+        "0.0.0.0",
+        port,
+        workers=workers,
+        request_timeout=timeout,
+        dry_run=dry_run,
+        action_workers=action_workers,
+    )
+
+
+bench_app = typer.Typer(help="Load test tailcode components")
+app.add_typer(bench_app, name="bench")
+
+
+@bench_app.command("webhook")
+def bench_webhook(
+    url: str = typer.Option(None, "--url", help="Running server to test; default starts a dry-run one"),
+    concurrency: int = typer.Option(8, "--concurrency", "-c", help="Concurrent keep-alive clients"),
+    duration: float = typer.Option(10.0, "--duration", "-d", help="Seconds to run"),
+    mix: str = typer.Option(None, "--mix", help="Route weights, e.g. health=4,status=4,wake=1,notify=1"),
+    device_name: str = typer.Option(None, "--device", help="Device for /wake (default: default_device)"),
+    token: str = typer.Option(None, "--token", envvar="TAILCODE_TOKEN", help="Webhook bearer token"),
+    workers: int = typer.Option(8, "--workers", help="Workers for the built-in server"),
+    allow_side_effects: bool = typer.Option(
+        False, "--allow-side-effects", help="Send /wake and /notify to a server that isn't a dry run"
+    ),
+    as_json: bool = typer.Option(False, "--json", help="Print the result as JSON"),
+):
+    """Measure webhook throughput and latency (RPS, p50/p95/p99, errors)."""
+    import threading
+
+    import httpx
+
+    from tailcode.loadgen import DEFAULT_MIX, SIDE_EFFECTS, parse_mix, run_load
+
+    try:
+        weights = parse_mix(mix or DEFAULT_MIX)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
+    config = get_config()
+    device = config.get_device(device_name) if device_name else config.get_default_device()
+    if "wake" in weights and not device:
+        console.print("[red]No device for /wake; pass --device or drop wake from --mix[/red]")
+        raise typer.Exit(1)
+
+    server = None
+    if url is None:
+        from tailcode.webhook import create_server
+
+        server = create_server("127.0.0.1", 0, workers=workers, dry_run=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+    else:
+        url = url.rstrip("/")
+        try:
+            health = httpx.get(f"{url}/health", timeout=5.0).json()
+        except (httpx.HTTPError, ValueError) as e:
+            console.print(f"[red]Can't reach {url}: {e}[/red]")
+            raise typer.Exit(1)
+        risky = sorted(set(weights) & set(SIDE_EFFECTS))
+        if risky and not health.get("dry_run") and not allow_side_effects:
+            console.print(
+                f"[red]{url} isn't running with --dry-run, so {', '.join(risky)} would really "
+                f"be sent.[/red] Drop them from --mix or pass --allow-side-effects."
+            )
+            raise typer.Exit(1)
+
+    if not as_json:
+        console.print(f"Load testing [cyan]{url}[/cyan] with {concurrency} clients for {duration:g}s...")
+    try:
+        result = run_load(
+            url,
+            weights,
+            concurrency=concurrency,
+            duration=duration,
+            token=token or "",
+            device=device.name if device else None,
+        )
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    if as_json:
+        print(json.dumps(result))
+        return
+
+    def ms(stats, key):
+        return f"{stats[key]:.1f}" if key in stats else "-"
+
+    table = Table(title=f"{result['requests']} requests, {result['rps']:.0f} req/s")
+    table.add_column("Route", style="cyan")
+    table.add_column("Requests", justify="right")
+    table.add_column("Errors", justify="right")
+    table.add_column("req/s", justify="right")
+    table.add_column("p50 ms", justify="right")
+    table.add_column("p95 ms", justify="right")
+    table.add_column("p99 ms", justify="right")
+    rows = [*result["routes"].items(), ("all", result)]
+    for route, stats in rows:
+        errors = f"[red]{stats['errors']}[/red]" if stats["errors"] else "0"
+        table.add_row(
+            route,
+            str(stats["requests"]),
+            errors,
+            f"{stats['rps']:.0f}",
+            ms(stats, "p50_ms"),
+            ms(stats, "p95_ms"),
+            ms(stats, "p99_ms"),
+        )
+    console.print(table)
+    if result["errors"]:
+        failed = {s: n for stats in result["routes"].values() for s, n in stats["statuses"].items()
+                  if not s.isdigit() or int(s) >= 300}
+        console.print(f"[dim]Error responses: {failed}[/dim]")
 
 
 def _ai_connect(
@@ -151,10 +591,12 @@ def _ai_connect(
     project: str | None,
     wake: bool,
     tool: str,
+    timing: bool = False,
+    timing_json: Path | None = None,
 ):
     from tailcode.ssh import ssh_connect_with_command
-    from tailcode.tailscale import is_peer_online
 
+    started = time.monotonic()
     config = get_config()
 
     if device_name is None:
@@ -174,14 +616,18 @@ def _ai_connect(
         console.print(f"[red]{device_name} is a client device, can't connect to it[/red]")
         raise typer.Exit(1)
 
-    if not is_peer_online(device.hostname):
-        if wake and device.can_wake:
-            console.print(f"[yellow]{device_name} offline, waking...[/yellow]")
-            _do_wake(device, config)
-            _wait_for_device(device, config, timeout=60)
-        else:
-            console.print(f"[red]{device_name} is offline[/red]")
-            raise typer.Exit(1)
+    with _timing(timing, timing_json):
+        snapshot = _connect_snapshot(device, config)
+        woke = not snapshot.is_online(device.hostname)
+        if woke:
+            if wake and device.can_wake:
+                console.print(f"[yellow]{device_name} offline, waking...[/yellow]")
+                _do_wake(device, config, snapshot=snapshot)
+                _wait_for_device(device, config)
+            else:
+                console.print(f"[red]{device_name} is offline[/red]")
+                raise typer.Exit(1)
+        _record_connect(device, started, woke)
 
     tool_cmd = tool if tool else config.preferences.default_tool
     tool_display = "Claude Code" if tool_cmd == "claude" else "OpenCode"
@@ -200,9 +646,11 @@ def ai(
     project: str = typer.Option(None, "--project", "-p", help="Project directory to cd into"),
     wake: bool = typer.Option(True, "--wake/--no-wake", "-w/-W", help="Auto-wake if offline"),
     tool: str = typer.Option(None, "--tool", "-t", help="AI tool to launch: opencode (default) or claude"),
+    timing: bool = typer.Option(False, "--timing", help="Show where the time went"),
+    timing_json: Path = typer.Option(None, "--timing-json", help="Write the timeline as JSON to a file"),
 ):
     """Connect to a device and launch AI coding assistant (OpenCode or Claude Code)."""
-    _ai_connect(device_name, project, wake, tool or "opencode")
+    _ai_connect(device_name, project, wake, tool or "opencode", timing, timing_json)
 
 
 @app.command()
@@ -211,9 +659,11 @@ def opencode(
     project: str = typer.Option(None, "--project", "-p", help="Project directory to cd into"),
     wake: bool = typer.Option(True, "--wake/--no-wake", "-w/-W", help="Auto-wake if offline"),
     tool: str = typer.Option(None, "--tool", "-t", help="AI tool to launch: opencode (default) or claude"),
+    timing: bool = typer.Option(False, "--timing", help="Show where the time went"),
+    timing_json: Path = typer.Option(None, "--timing-json", help="Write the timeline as JSON to a file"),
 ):
     """Connect to a device and launch OpenCode (alias for 'tc ai')."""
-    _ai_connect(device_name, project, wake, tool or "opencode")
+    _ai_connect(device_name, project, wake, tool or "opencode", timing, timing_json)
 
 
 @app.command()
@@ -334,12 +784,13 @@ def location(
     table.add_column("Wake Relay")
     table.add_column("Relay Status")
     
-    from tailcode.tailscale import is_peer_online
+    from tailcode.cache import get_status
     
+    snapshot = get_status(config.preferences.status_cache_ttl)
     for name, loc in config.locations.items():
         relay_device = config.get_device(loc.wake_relay) if loc.wake_relay else None
         if relay_device:
-            online = is_peer_online(relay_device.hostname)
+            online = snapshot.is_online(relay_device.hostname)
             relay_status = "[green]online[/green]" if online else "[dim]offline[/dim]"
             relay_name = loc.wake_relay
         else:
@@ -432,45 +883,207 @@ def setup():
     console.print("  4. Run [cyan]tc install[/cyan] to set up webhook server")
 
 
-def _do_wake(device, config):
-    from tailcode.notify import notify
+def _connect_snapshot(device, config):
+    """Trust a cached status younger than the TTL if it says the device is up.
+
+    Anything else (no cache, too old, or cached as offline) is re-checked
+    before we commit to waking the device.
+    """
+    from tailcode import timeline
+    from tailcode.cache import load_cached_status, refresh_status
+
+    with timeline.span("status") as span:
+        cached = load_cached_status()
+        if (
+            cached is not None
+            and cached.age <= config.preferences.status_cache_ttl
+            and cached.is_online(device.hostname)
+        ):
+            if span:
+                span.detail = "cached"
+            return cached
+        return refresh_status()
+
+
+def _do_wake(device, config, snapshot=None):
+    from tailcode import telemetry, timeline
+    from tailcode.cache import get_cache_dir
+    from tailcode.notify import notify_async
+    from tailcode.singleflight import do_across_processes
     from tailcode.wol import find_wake_relay, wake_device
 
     if not device.can_wake:
         console.print(f"[red]{device.name} has no MAC address configured[/red]")
         raise typer.Exit(1)
 
-    relay = find_wake_relay(device, config)
-    if relay:
-        console.print(f"Waking [cyan]{device.name}[/cyan] via [dim]{relay.name}[/dim]...")
-    else:
-        console.print(f"Waking [cyan]{device.name}[/cyan] (local broadcast)...")
-
-    result = wake_device(device, config, relay=relay)
-
-    if result["success"]:
+    def send() -> dict:
+        with timeline.span("find_relay") as span:
+            relay = find_wake_relay(device, config, snapshot=snapshot)
+            if span:
+                span.detail = relay.name if relay else "none"
+        if relay:
+            console.print(f"Waking [cyan]{device.name}[/cyan] via [dim]{relay.name}[/dim]...")
+        else:
+            console.print(f"Waking [cyan]{device.name}[/cyan] (local broadcast)...")
+
+        result = wake_device(device, config, relay=relay)
+        if result["success"] and config.preferences.auto_wake:
+            with timeline.span("notify"):
+                notify_async(f"Waking {device.name}", config=config)
+        return result
+
+    # Another tc process waking the same device (or one that just did) is
+    # waited on and reused instead of sending a second relay hop.
+    with timeline.span("wake") as span:
+        result, shared = do_across_processes(
+            get_cache_dir() / "wakes",
+            device.name,
+            send,
+            cooldown=config.preferences.wake_cooldown,
+            keep=lambda r: r["success"],
+        )
+        if span:
+            span.detail = "coalesced" if shared else (result["method"] or "")
+
+    telemetry.record(
+        "wake_request",
+        device.name,
+        ok=result["success"],
+        method=result["method"],
+        detail="coalesced" if shared else None,
+    )
+    if shared:
+        console.print(f"[dim]{device.name} was just woken ({result['method']}), not resending[/dim]")
+    elif result["success"]:
         console.print(f"[green]WoL sent[/green] ({result['method']})")
-        if config.preferences.auto_wake:
-            notify(f"Waking {device.name}", config=config)
     else:
         console.print(f"[red]Failed: {result.get('error')}[/red]")
         raise typer.Exit(1)
 
 
-def _wait_for_device(device, config, timeout: int = 60):
-    from tailcode.ssh import is_reachable
+# What a device is still doing, judging by the last probe stage it passed.
+_WAIT_PHASES = {None: "booting", "tailscale": "sshd", "tcp": "sshd", "banner": "login"}
+
+
+def _wait_for_device(device, config, timeout: float | None = None):
+    from tailcode import telemetry, timeline
+    from tailcode.boottime import (
+        EXTEND_TIMEOUT,
+        MAX_TIMEOUT,
+        BootModel,
+        record_boot_time,
+        record_timeout,
+    )
+    from tailcode.probe import probe
+
+    # Probe timing and the timeout come from this device's past wakes.
+    model = BootModel.for_device(device.name)
+    learned = timeout is None
+    if learned:
+        timeout = model.timeout()
 
     console.print(f"Waiting for [cyan]{device.name}[/cyan]...", end="")
-    start = time.time()
-    while time.time() - start < timeout:
-        if is_reachable(device, config):
+    start = time.monotonic()
+    attempts = 0
+    wait_span = timeline.begin("wait")
+    phase, phase_span = None, None
+    while time.monotonic() - start < timeout:
+        # Cheap stages (tailscale, TCP, SSH banner) gate the SSH login, so a
+        # device that is still booting fails fast instead of timing out.
+        result = probe(device, config)
+        attempts += 1
+        elapsed = time.monotonic() - start
+        current = "ready" if result.ok else _WAIT_PHASES[result.reached]
+        if wait_span and current != phase:
+            timeline.end(phase_span)
+            phase = current
+            # The first phase seen is taken to have started with the wait.
+            phase_span = timeline.begin(phase) if phase != "ready" else None
+            if phase_span and attempts == 1:
+                phase_span.start = wait_span.start
+        if result.ok:
+            timeline.end(wait_span, f"{attempts} probes")
             console.print(" [green]ready[/green]")
+            telemetry.record(
+                "ready", device.name, ok=True, duration=elapsed, detail=f"{attempts} probes"
+            )
+            # A device that answered the first probe was never asleep.
+            if attempts > 1:
+                record_boot_time(device.name, elapsed)
             return
         console.print(".", end="")
-        time.sleep(3)
+        delay = model.next_delay(elapsed)
+        if learned and result.reached in ("tcp", "banner") and elapsed + delay >= timeout:
+            # Slower than usual, but the device is up and sshd is answering,
+            # so login is close: keep waiting. (Passing the tailscale stage
+            # proves nothing: it passes whenever status is unavailable.)
+            timeout = min(MAX_TIMEOUT, max(timeout, elapsed + EXTEND_TIMEOUT))
+        time.sleep(min(delay, max(0.0, timeout - elapsed)))
+    elapsed = time.monotonic() - start
+    timeline.end(phase_span)
+    timeline.end(wait_span, f"timeout after {attempts} probes")
     console.print(" [red]timeout[/red]")
+    telemetry.record("ready", device.name, ok=False, duration=elapsed, detail=f"{attempts} probes")
+    # It takes at least this long, so the next wait will be longer.
+    if attempts > 1:
+        record_timeout(device.name, elapsed)
     raise typer.Exit(1)
 
 
+def _record_connect(device, started: float, woke: bool):
+    """Time from running the command to handing the terminal to ssh."""
+    from tailcode import telemetry
+
+    telemetry.record(
+        "connect",
+        device.name,
+        ok=True,
+        duration=time.monotonic() - started,
+        detail="woke" if woke else "online",
+    )
+
+
+@contextmanager
+def _timing(show: bool, json_path: Path | None):
+    """Record a timeline of the enclosed steps if asked, and report it on the way out."""
+    from tailcode import timeline
+
+    if not show and json_path is None:
+        yield
+        return
+    timeline.start()
+    try:
+        yield
+    finally:
+        recorded = timeline.stop()
+        if json_path is not None:
+            json_path.write_text(json.dumps(recorded.to_dict(), indent=2) + "\n")
+        if show:
+            console.print(_timeline_table(recorded))
+
+
+def _timeline_table(recorded) -> Table:
+    width = 30
+    total = max(recorded.total, 1e-9)
+    table = Table(title=f"Timeline ({recorded.total:.2f}s)")
+    table.add_column("Phase", style="cyan")
+    table.add_column("Start", justify="right")
+    table.add_column("Time", justify="right")
+    table.add_column("", no_wrap=True)
+    table.add_column("Detail", style="dim")
+    for span in recorded.spans:
+        offset = span.start - recorded.origin
+        lead = int(offset / total * width)
+        bar = " " * lead + "█" * max(1, int(span.duration / total * width))
+        table.add_row(
+            "  " * span.depth + span.name,
+            f"{offset:.2f}s",
+            f"{span.duration:.2f}s",
+            bar[:width],
+            span.detail,
+        )
+    return table
+
+
 if __name__ == "__main__":
     app()
@@ -36,22 +36,71 @@ class TailscaleConfig:
     tailnet: str = "-"
 
 
+NOTIFICATION_PROVIDERS = ("ntfy", "pushover", "telegram")
+NOTIFICATION_POLICIES = ("all", "first_success", "failover")
+
+
 @dataclass
 class NtfyConfig:
     server: str = "https://ntfy.sh"
     topic: str = "tailcode-alerts"
+    timeout: float | None = None
+
+
+@dataclass
+class PushoverConfig:
+    app_token: str = ""
+    user_key: str = ""
+    timeout: float | None = None
+
+
+@dataclass
+class TelegramConfig:
+    bot_token: str = ""
+    chat_id: str = ""
+    timeout: float | None = None
+
+
+@dataclass
+class StreamConfig:
+    """Settings for `tc notify --stdin`."""
+
+    # Regexes; a line matching any of them is sent. Empty sends every line.
+    patterns: list[str] = field(default_factory=list)
+    # Matches within this many seconds of the first go out as one digest.
+    window: float = 2.0
+    # At most `burst` notifications at once, refilling at `rate` per minute.
+    rate: float = 6.0
+    burst: int = 3
+    # Lines quoted in a digest; the rest are only counted.
+    max_lines: int = 10
 
 
 @dataclass
 class NotificationConfig:
     provider: str = "ntfy"
+    # Several providers, in failover order; overrides `provider` when set.
+    providers: list[str] = field(default_factory=list)
+    # all, first_success or failover
+    policy: str = "all"
+    timeout: float = 10.0
     ntfy: NtfyConfig = field(default_factory=NtfyConfig)
+    pushover: PushoverConfig = field(default_factory=PushoverConfig)
+    telegram: TelegramConfig = field(default_factory=TelegramConfig)
+    stream: StreamConfig = field(default_factory=StreamConfig)
+
+    @property
+    def provider_names(self) -> list[str]:
+        return self.providers or [self.provider]
 
 
 @dataclass
 class SSHConfig:
     use_tailscale_ssh: bool = True
     session_name: str = "ai"
+    jobs_session: str = "tc-jobs"
+    multiplex: bool = True
+    control_persist: int = 300
 
 
 @dataclass
@@ -65,6 +114,8 @@ class Preferences:
     default_device: str = ""
     default_tool: str = "opencode"
     auto_wake: bool = True
+    status_cache_ttl: int = 30
+    wake_cooldown: int = 30
 
 
 @dataclass
@@ -137,18 +188,57 @@ def _parse_config(data: dict[str, Any]) -> Config:
 
     notif_data = data.get("notifications", {})
     ntfy_data = notif_data.get("ntfy", {})
+    pushover_data = notif_data.get("pushover", {})
+    telegram_data = notif_data.get("telegram", {})
+    stream_data = notif_data.get("stream", {})
+    patterns = stream_data.get("patterns", [])
+    providers = notif_data.get("providers", [])
     notifications = NotificationConfig(
         provider=notif_data.get("provider", "ntfy"),
+        providers=[providers] if isinstance(providers, str) else list(providers),
+        policy=notif_data.get("policy", "all"),
+        timeout=notif_data.get("timeout", 10.0),
         ntfy=NtfyConfig(
             server=ntfy_data.get("server", "https://ntfy.sh"),
             topic=ntfy_data.get("topic", "tailcode-alerts"),
+            timeout=ntfy_data.get("timeout"),
+        ),
+        pushover=PushoverConfig(
+            app_token=pushover_data.get("app_token", ""),
+            user_key=pushover_data.get("user_key", ""),
+            timeout=pushover_data.get("timeout"),
+        ),
+        telegram=TelegramConfig(
+            bot_token=str(telegram_data.get("bot_token", "")),
+            chat_id=str(telegram_data.get("chat_id", "")),
+            timeout=telegram_data.get("timeout"),
+        ),
+        stream=StreamConfig(
+            patterns=[patterns] if isinstance(patterns, str) else list(patterns),
+            window=stream_data.get("window", 2.0),
+            rate=stream_data.get("rate", 6.0),
+            burst=stream_data.get("burst", 3),
+            max_lines=stream_data.get("max_lines", 10),
         ),
     )
 
+    for name in notifications.provider_names:
+        if name not in NOTIFICATION_PROVIDERS:
+            choices = ", ".join(NOTIFICATION_PROVIDERS)
+            raise ValueError(f"Unknown notification provider: {name} (choose from {choices})")
+    if notifications.policy not in NOTIFICATION_POLICIES:
+        choices = ", ".join(NOTIFICATION_POLICIES)
+        raise ValueError(
+            f"Unknown notification policy: {notifications.policy} (choose from {choices})"
+        )
+
     ssh_data = data.get("ssh", {})
     ssh = SSHConfig(
         use_tailscale_ssh=ssh_data.get("use_tailscale_ssh", True),
         session_name=ssh_data.get("session_name", "ai"),
+        jobs_session=ssh_data.get("jobs_session", "tc-jobs"),
+        multiplex=ssh_data.get("multiplex", True),
+        control_persist=ssh_data.get("control_persist", 300),
     )
 
     pref_data = data.get("preferences", {})
@@ -156,6 +246,8 @@ def _parse_config(data: dict[str, Any]) -> Config:
         default_device=pref_data.get("default_device", ""),
         default_tool=pref_data.get("default_tool", "opencode"),
         auto_wake=pref_data.get("auto_wake", True),
+        status_cache_ttl=pref_data.get("status_cache_ttl", 30),
+        wake_cooldown=pref_data.get("wake_cooldown", 30),
     )
 
     return Config(
@@ -168,17 +260,24 @@ def _parse_config(data: dict[str, Any]) -> Config:
     )
 
 
+def config_search_paths() -> list[Path]:
+    return [
+        Path.cwd() / "config" / "config.yaml",
+        Path.cwd() / "config.yaml",
+        Path.home() / ".config" / "tailcode" / "config.yaml",
+    ]
+
+
+def find_config_path() -> Path | None:
+    for p in config_search_paths():
+        if p.exists():
+            return p
+    return None
+
+
 def load_config(path: Path | str | None = None) -> Config:
     if path is None:
-        search_paths = [
-            Path.cwd() / "config" / "config.yaml",
-            Path.cwd() / "config.yaml",
-            Path.home() / ".config" / "tailcode" / "config.yaml",
-        ]
-        for p in search_paths:
-            if p.exists():
-                path = p
-                break
+        path = find_config_path()
 
     if path is None:
         return Config()
@@ -0,0 +1,98 @@
+"""Reload config.yaml in a long-running process when the file changes."""
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from tailcode.config import Config, find_config_path, load_config
+
+
+def _signature(path: Path) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ConfigWatcher:
+    """Holds the current Config and swaps in a new one when the file changes.
+
+    A background thread stats the file every `interval` seconds. A change
+    is only parsed once the file has stopped changing for `debounce`
+    seconds, so a half-written save isn't picked up. `config` is replaced
+    by a single assignment: readers that took a reference keep using the
+    old object. A file that fails to parse, or goes missing, leaves the
+    previous config in place and sets `last_error`. With no `path`, the
+    usual config locations are checked until a file turns up there.
+    """
+
+    def __init__(
+        self,
+        path: Path | None,
+        config: Config | None = None,
+        interval: float = 2.0,
+        debounce: float = 0.5,
+        on_reload: Callable[[Config], None] | None = None,
+    ):
+        self.path = path
+        self.config = config if config is not None else load_config(path) if path else Config()
+        self.interval = interval
+        self.debounce = debounce
+        self.on_reload = on_reload
+        self.loaded_at = time.time()
+        self.last_error: str | None = None
+        self._signature = _signature(path) if path else None
+        self._thread = threading.Thread(target=self._run, name="tailcode-config", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def check(self) -> bool:
+        """Reload if the file changed; returns True if a new config was swapped in."""
+        if self.path is None:
+            self.path = find_config_path()
+            if self.path is None:
+                return False
+        signature = _signature(self.path)
+        if signature is None:
+            self._missing()
+            return False
+        if signature == self._signature:
+            return False
+        while True:
+            time.sleep(self.debounce)
+            settled = _signature(self.path)
+            if settled is None:
+                self._missing()
+                return False
+            if settled == signature:
+                break
+            signature = settled
+
+        self._signature = signature
+        try:
+            config = load_config(self.path)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return False
+        self.config = config
+        self.loaded_at = time.time()
+        self.last_error = None
+        if self.on_reload is not None:
+            self.on_reload(config)
+        return True
+
+    def _missing(self) -> None:
+        self.last_error = f"Config file missing: {self.path}"
+        # Reload whatever appears there next, even if it matches the old file.
+        self._signature = None
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:
+                pass
@@ -1,46 +1,40 @@
 """Auto-discovery of Tailscale devices."""
-import json
 from pathlib import Path
 
-from tailcode.config import Config, Device, load_config
-from tailcode.tailscale import get_tailscale_status
+from tailcode.config import Config, Device
+from tailcode.tailscale import PeerStatus, get_status_snapshot
 
 
 def discover_devices() -> list[dict]:
     """Discover all devices from Tailscale network."""
-    status = get_tailscale_status()
-    if not status:
+    snapshot = get_status_snapshot()
+    if not snapshot.available:
         return []
     
     devices = []
     
     # Add self
-    self_info = status.get("Self", {})
-    if self_info:
-        devices.append({
-            "hostname": self_info.get("HostName", ""),
-            "name": self_info.get("DNSName", "").split(".")[0],
-            "ip": self_info.get("TailscaleIPs", [""])[0],
-            "os": self_info.get("OS", ""),
-            "online": True,
-            "is_self": True,
-        })
+    if snapshot.self_peer:
+        devices.append(_peer_to_dict(snapshot.self_peer, is_self=True))
     
     # Add peers
-    peers = status.get("Peer", {})
-    for peer_id, peer in peers.items():
-        devices.append({
-            "hostname": peer.get("HostName", ""),
-            "name": peer.get("DNSName", "").split(".")[0],
-            "ip": peer.get("TailscaleIPs", [""])[0] if peer.get("TailscaleIPs") else "",
-            "os": peer.get("OS", ""),
-            "online": peer.get("Online", False),
-            "is_self": False,
-        })
+    for peer in snapshot.peers:
+        devices.append(_peer_to_dict(peer, is_self=False))
     
     return devices
 
 
+def _peer_to_dict(peer: PeerStatus, is_self: bool) -> dict:
+    return {
+        "hostname": peer.hostname,
+        "name": peer.dns_name,
+        "ip": peer.ips[0] if peer.ips else "",
+        "os": peer.os,
+        "online": True if is_self else peer.online,
+        "is_self": is_self,
+    }
+
+
 def guess_role(device: dict) -> str:
     """Guess device role based on OS."""
     os_name = device.get("os", "").lower()
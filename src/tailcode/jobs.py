@@ -0,0 +1,92 @@
+"""In-memory table of background jobs for the webhook's async mode."""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Job:
+    id: str
+    action: str
+    phase: str = "queued"
+    state: str = "pending"  # pending -> running -> done | failed
+    result: dict | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def set_phase(self, phase: str) -> None:
+        self.phase = phase
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "action": self.action,
+            "state": self.state,
+            "phase": self.phase,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobTable:
+    """Runs actions on an executor and remembers their outcome.
+
+    Job functions are called as `fn(*args, on_phase=job.set_phase)` and
+    return a JSON-able dict. At most `max_pending` jobs may be queued or
+    running; only the newest `max_finished` finished jobs are kept.
+    """
+
+    def __init__(self, executor: Executor, max_pending: int = 64, max_finished: int = 256):
+        self.executor = executor
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+        self._pending: dict[str, Job] = {}
+        self._finished: OrderedDict[str, Job] = OrderedDict()
+
+    def submit(
+        self, action: str, fn: Callable[..., dict], *args, executor: Executor | None = None
+    ) -> Job | None:
+        """Queue `fn`, or return None if too many jobs are already pending.
+
+        Runs on the table's executor unless another `executor` is given.
+        """
+        job = Job(id=secrets.token_hex(8), action=action)
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                return None
+            self._pending[job.id] = job
+        (executor or self.executor).submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._pending.get(job_id) or self._finished.get(job_id)
+
+    def _run(self, job: Job, fn: Callable[..., dict], args: tuple) -> None:
+        job.state = "running"
+        job.phase = "running"
+        try:
+            job.result = fn(*args, on_phase=job.set_phase)
+            job.state = "done"
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.state = "failed"
+        job.phase = job.state
+        job.finished_at = time.time()
+        with self._lock:
+            self._pending.pop(job.id, None)
+            self._finished[job.id] = job
+            while len(self._finished) > self.max_finished:
+                self._finished.popitem(last=False)
@@ -0,0 +1,121 @@
+"""Incremental parsing of large JSON documents such as `tailscale status --json`.
+
+Only the members named in `stream_keys` are walked item by item; each item
+is decoded on its own and handed to the caller, so the full document never
+exists as one Python object tree.
+"""
+import json
+import re
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+_decoder = json.JSONDecoder()
+
+
+def iter_chunks(text: str, size: int = CHUNK_SIZE) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+class _Reader:
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self.buf = ""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            if self.pos:
+                self.buf = self.buf[self.pos:]
+                self.pos = 0
+            self.buf += chunk
+            return True
+        return False
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def take(self, expected: str) -> str:
+        char = self.peek()
+        if char not in expected:
+            raise ValueError(f"Expected one of {expected!r} at offset {self.pos}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A value ending at the buffer edge, or a number followed by more
+            # number characters, may have been cut off by the chunk boundary.
+            truncated = end == len(self.buf) or (
+                isinstance(value, (int, float)) and self.buf[end] in _NUMBER_CHARS
+            )
+            if truncated and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_container(reader: _Reader, key: str) -> Iterator[tuple[str, Any, Any]]:
+    closer = "}" if reader.take("{[") == "{" else "]"
+    if reader.peek() == closer:
+        reader.pos += 1
+        return
+    index = 0
+    while True:
+        if closer == "}":
+            item_key = reader.value()
+            reader.take(":")
+        else:
+            item_key = index
+            index += 1
+        yield key, item_key, reader.value()
+        if reader.take(",}]") == closer:
+            return
+
+
+def iter_members(
+    chunks: Iterable[str],
+    stream_keys: Iterable[str],
+    keep: Iterable[str] = (),
+) -> Iterator[tuple[str, Any, Any]]:
+    """Walk the top-level object in `chunks`, yielding `(key, item_key, value)`.
+
+    Members in `stream_keys` yield once per element (`item_key` is the
+    object key or list index). Members in `keep` yield once with
+    `item_key=None`. Everything else is decoded and dropped.
+    """
+    stream_keys = set(stream_keys)
+    keep = set(keep)
+    reader = _Reader(chunks)
+    reader.take("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.take(":")
+        if key in stream_keys and reader.peek() in "{[":
+            yield from _iter_container(reader, key)
+        elif key in keep:
+            yield key, None, reader.value()
+        else:
+            reader.value()
+        if reader.take(",}") == "}":
+            return
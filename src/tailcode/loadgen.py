@@ -0,0 +1,142 @@
+"""Closed-loop load generator for the webhook server (`tc bench webhook`)."""
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import httpx
+
+from tailcode.boottime import percentile
+
+ROUTES = ("health", "status", "wake", "notify")
+# Routes that wake a device or push a notification on a real server.
+SIDE_EFFECTS = ("wake", "notify")
+DEFAULT_MIX = "health=4,status=4,wake=1,notify=1"
+
+
+def parse_mix(spec: str) -> dict[str, int]:
+    """Parse "health=4,status=1" into route weights; a bare route name weighs 1."""
+    mix: dict[str, int] = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        route, _, weight = part.partition("=")
+        route = route.strip()
+        if route not in ROUTES:
+            raise ValueError(f"unknown route: {route} (choose from {', '.join(ROUTES)})")
+        try:
+            mix[route] = int(weight) if weight else 1
+        except ValueError:
+            raise ValueError(f"invalid weight for {route}: {weight}") from None
+        if mix[route] < 0:
+            raise ValueError(f"invalid weight for {route}: {weight}")
+    mix = {route: weight for route, weight in mix.items() if weight}
+    if not mix:
+        raise ValueError("empty request mix")
+    return mix
+
+
+def _request(route: str, device: str | None) -> tuple[str, str, dict | None]:
+    if route == "health":
+        return "GET", "/health", None
+    if route == "status":
+        return "POST", "/status", {}
+    if route == "wake":
+        return "POST", "/wake", {"device": device}
+    return "POST", "/notify", {"message": "tc bench", "title": "Tailcode bench"}
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+
+    def add(self, other: "RouteStats") -> None:
+        self.latencies.extend(other.latencies)
+        self.statuses.update(other.statuses)
+        self.errors += other.errors
+
+    def to_dict(self, elapsed: float) -> dict:
+        result = {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rps": round(len(self.latencies) / elapsed, 1) if elapsed else 0.0,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items(), key=str)},
+        }
+        if self.latencies:
+            result.update({
+                "p50_ms": round(percentile(self.latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(self.latencies, 95) * 1000, 2),
+                "p99_ms": round(percentile(self.latencies, 99) * 1000, 2),
+                "max_ms": round(max(self.latencies) * 1000, 2),
+            })
+        return result
+
+
+def run_load(
+    url: str,
+    mix: dict[str, int],
+    concurrency: int = 8,
+    duration: float = 10.0,
+    token: str = "",
+    device: str | None = None,
+    seed: int = 0,
+) -> dict:
+    """Keep `concurrency` keep-alive clients busy for `duration` seconds.
+
+    Each client sends its next request as soon as the last one returns,
+    picking routes at random by `mix` weight. Any non-2xx response or
+    transport error counts as an error.
+    """
+    if "wake" in mix and not device:
+        raise ValueError("a device is required when the mix includes wake")
+    routes, weights = zip(*mix.items())
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    totals = {route: RouteStats() for route in routes}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker(n: int) -> None:
+        rng = random.Random(seed + n)
+        mine = {route: RouteStats() for route in routes}
+        with httpx.Client(base_url=url, headers=headers, timeout=60.0) as client:
+            while time.monotonic() < stop_at:
+                route = rng.choices(routes, weights)[0]
+                method, path, body = _request(route, device)
+                stats = mine[route]
+                start = time.perf_counter()
+                try:
+                    response = client.request(method, path, json=body)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                stats.latencies.append(time.perf_counter() - start)
+                stats.statuses[status] += 1
+                if not (isinstance(status, int) and status < 300):
+                    stats.errors += 1
+        with lock:
+            for route, stats in mine.items():
+                totals[route].add(stats)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    overall = RouteStats()
+    for stats in totals.values():
+        overall.add(stats)
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "duration": round(elapsed, 2),
+        "mix": mix,
+        **overall.to_dict(elapsed),
+        "routes": {route: stats.to_dict(elapsed) for route, stats in totals.items()},
+    }
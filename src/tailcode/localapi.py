@@ -0,0 +1,93 @@
+"""Client for tailscaled's LocalAPI, spoken over its unix socket."""
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import httpx
+
+from tailcode.jsonstream import CHUNK_SIZE
+
+SOCKET_ENV = "TAILCODE_TAILSCALED_SOCKET"
+DEFAULT_SOCKET_PATHS = [
+    "/var/run/tailscaled.socket",
+    "/var/run/tailscale/tailscaled.sock",
+    "/run/tailscale/tailscaled.sock",
+]
+# tailscaled rejects LocalAPI requests whose Host isn't this name.
+LOCALAPI_HOST = "local-tailscaled.sock"
+
+
+def find_socket() -> str | None:
+    override = os.environ.get(SOCKET_ENV)
+    if override:
+        return override
+    for path in DEFAULT_SOCKET_PATHS:
+        if Path(path).exists():
+            return path
+    return None
+
+
+class LocalAPI:
+    def __init__(self, socket_path: str | None = None, timeout: float = 2.0):
+        self.socket_path = socket_path or find_socket()
+        self.timeout = timeout
+        self._client: httpx.Client | None = None
+
+    @property
+    def available(self) -> bool:
+        return self.socket_path is not None and Path(self.socket_path).exists()
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(
+                transport=httpx.HTTPTransport(uds=self.socket_path),
+                base_url=f"http://{LOCALAPI_HOST}",
+                timeout=self.timeout,
+            )
+        return self._client
+
+    def _get(self, endpoint: str, params: dict | None = None) -> dict | None:
+        if not self.available:
+            return None
+        try:
+            response = self._get_client().get(f"/localapi/v0{endpoint}", params=params)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError):
+            return None
+
+    def status(self, peers: bool = True) -> dict | None:
+        """Same document as `tailscale status --json`; skip the peer map if unneeded."""
+        return self._get("/status", params=None if peers else {"peers": "false"})
+
+    def iter_status_text(self) -> Iterator[str]:
+        """Stream the raw status document for incremental parsing."""
+        with self._get_client().stream("GET", "/localapi/v0/status") as response:
+            response.raise_for_status()
+            yield from response.iter_text(CHUNK_SIZE)
+
+    def local_ip(self) -> str | None:
+        status = self.status(peers=False)
+        if not status:
+            return None
+        ips = (status.get("Self") or {}).get("TailscaleIPs") or status.get("TailscaleIPs") or []
+        for ip in ips:
+            if ":" not in ip:
+                return ip
+        return None
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+_localapi: LocalAPI | None = None
+
+
+def get_localapi() -> LocalAPI:
+    """Process-wide LocalAPI client, so repeated status calls reuse one connection."""
+    global _localapi
+    if _localapi is None:
+        _localapi = LocalAPI()
+    return _localapi
@@ -0,0 +1,229 @@
+"""In-process counters and histograms, rendered in Prometheus text format.
+
+Each thread updates its own shard of a metric, so the hot path is a plain
+dict update with no lock; shards are only merged when /metrics is scraped.
+When a thread exits, its shard is folded into a shared total, so
+short-lived threads don't pile up shards.
+"""
+import threading
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Retire:
+    """Lives in a thread's local storage; folds its shard away when the thread ends."""
+
+    def __init__(self, metric: "_Metric", shard: dict):
+        self.metric = metric
+        self.shard = shard
+
+    def __del__(self):
+        self.metric._retire(self.shard)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._local = threading.local()
+        self._shards: dict[int, dict] = {}
+        self._retired: dict = {}
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                self._shards[id(shard)] = shard
+            self._local.shard = shard
+            self._local.retire = _Retire(self, shard)
+        return shard
+
+    def _retire(self, shard: dict) -> None:
+        with self._lock:
+            self._shards.pop(id(shard), None)
+            for key, value in shard.items():
+                self._retired[key] = self._combine(self._retired.get(key), value)
+
+    def _combine(self, total, value):
+        raise NotImplementedError
+
+    def _key(self, labels: tuple) -> tuple[str, ...]:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {labels}")
+        return tuple(str(v) for v in labels)
+
+    def _items(self):
+        with self._lock:
+            shards = list(self._shards.values())
+            retired = list(self._retired.items())
+        yield from retired
+        for shard in shards:
+            yield from list(shard.items())
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        shard = self._shard()
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def _combine(self, total: float | None, value: float) -> float:
+        return (total or 0.0) + value
+
+    def values(self) -> dict[tuple[str, ...], float]:
+        totals: dict[tuple[str, ...], float] = {}
+        for key, value in self._items():
+            totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {_format(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels: str, value: float) -> None:
+        key = self._key(labels)
+        shard = self._shard()
+        state = shard.get(key)
+        if state is None:
+            # Per-bucket counts (the last is +Inf), then sum and count.
+            state = shard[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def _combine(self, total: list | None, state: list) -> list:
+        if total is None:
+            return [list(state[0]), state[1], state[2]]
+        counts = [a + b for a, b in zip(total[0], state[0])]
+        return [counts, total[1] + state[1], total[2] + state[2]]
+
+    def values(self) -> dict[tuple[str, ...], tuple[list[int], float, int]]:
+        totals: dict[tuple[str, ...], list] = {}
+        for key, (counts, total, count) in self._items():
+            merged = totals.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+            merged[2] += count
+        return {key: tuple(v) for key, v in totals.items()}
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, (counts, total, count) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _format(bound)
+                labels = _labels(self.label_names, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_format(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[_Metric] = []
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "tailcode_http_requests_total", "Webhook requests handled.", ("route", "method", "status")
+)
+HTTP_DURATION = REGISTRY.histogram(
+    "tailcode_http_request_duration_seconds", "Webhook request latency.", ("route",)
+)
+HTTP_REJECTED = REGISTRY.counter(
+    "tailcode_http_rejected_total", "Connections turned away with 503 because all slots were busy."
+)
+WAKES = REGISTRY.counter(
+    "tailcode_wakes_total", "Wake requests by method (local or relay:<name>) and outcome.",
+    ("method", "outcome"),
+)
+NOTIFICATIONS = REGISTRY.counter(
+    "tailcode_notifications_total", "Notifications by provider and outcome.", ("provider", "outcome")
+)
+NOTIFY_DURATION = REGISTRY.histogram(
+    "tailcode_notification_duration_seconds", "Notification delivery latency.", ("provider",),
+    buckets=SLOW_BUCKETS,
+)
+SUBPROCESS_DURATION = REGISTRY.histogram(
+    "tailcode_subprocess_duration_seconds", "Duration of subprocess calls (tailscale, ssh, ...).",
+    ("command",), buckets=SLOW_BUCKETS,
+)
+
+
+def observe_subprocesses() -> None:
+    """Feed subprocess call durations into SUBPROCESS_DURATION from now on."""
+    from tailcode.profiling import add_listener
+
+    def listener(call) -> None:
+        if call.kind == "subprocess":
+            SUBPROCESS_DURATION.observe(call.group, value=call.duration)
+
+    add_listener(listener)
@@ -1,40 +1,102 @@
+import atexit
+import queue
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 
 import httpx
 
-from tailcode.config import Config
+from tailcode.config import NOTIFICATION_POLICIES, Config
+from tailcode.outbox import OUTBOX_FILE, Outbox
+
+COALESCE_WINDOW = 1.0
+QUEUE_SIZE = 100
+# Backoff between attempts at a failing send; the last delay then repeats.
+RETRY_DELAYS = (1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+# How often an idle worker checks the outbox for entries other processes left.
+IDLE_POLL = 60.0
+# An entry still failing after this many attempts, or this old, is given up on.
+MAX_ATTEMPTS = 50
+MAX_AGE = 6 * 3600.0
+
+# Outcomes of one send.
+OK = "ok"
+RETRY = "retry"
+REJECTED = "rejected"
+
+
+def outcome(status_code: int) -> str:
+    """OK for 2xx; REJECTED for a 4xx that sending again won't fix; else RETRY."""
+    if 200 <= status_code < 300:
+        return OK
+    if 400 <= status_code < 500 and status_code not in (408, 425, 429):
+        return REJECTED
+    return RETRY
 
 
 class NotificationProvider(ABC):
+    """A push channel. Each provider keeps one pooled HTTP client for its lifetime."""
+
+    name = ""
+    timeout = 10.0
+    _client: httpx.Client | None = None
+    _client_lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(timeout=self.timeout)
+        return self._client
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
     @abstractmethod
-    def send(self, message: str, title: str | None = None) -> bool:
+    def request(self, message: str, title: str | None = None) -> httpx.Response:
         pass
 
+    def attempt(self, message: str, title: str | None = None) -> str:
+        """Send once and return OK, RETRY or REJECTED."""
+        try:
+            return outcome(self.request(message, title).status_code)
+        except httpx.HTTPError:
+            return RETRY
+
+    def send(self, message: str, title: str | None = None) -> bool:
+        return self.attempt(message, title) == OK
+
 
 class NtfyProvider(NotificationProvider):
-    def __init__(self, server: str, topic: str):
+    name = "ntfy"
+
+    def __init__(self, server: str, topic: str, timeout: float = 10.0):
+        self.timeout = timeout
         self.server = server.rstrip("/")
         self.topic = topic
 
-    def send(self, message: str, title: str | None = None) -> bool:
+    def request(self, message: str, title: str | None = None) -> httpx.Response:
         url = f"{self.server}/{self.topic}"
         headers = {}
         if title:
             headers["Title"] = title
-        try:
-            with httpx.Client() as client:
-                response = client.post(url, content=message, headers=headers, timeout=10.0)
-                return response.status_code == 200
-        except httpx.HTTPError:
-            return False
+        return self.client.post(url, content=message, headers=headers)
 
 
 class PushoverProvider(NotificationProvider):
-    def __init__(self, app_token: str, user_key: str):
+    name = "pushover"
+
+    def __init__(self, app_token: str, user_key: str, timeout: float = 10.0):
+        self.timeout = timeout
         self.app_token = app_token
         self.user_key = user_key
 
-    def send(self, message: str, title: str | None = None) -> bool:
+    def request(self, message: str, title: str | None = None) -> httpx.Response:
         data = {
             "token": self.app_token,
             "user": self.user_key,
@@ -42,65 +104,449 @@ class PushoverProvider(NotificationProvider):
         }
         if title:
             data["title"] = title
-        try:
-            with httpx.Client() as client:
-                response = client.post(
-                    "https://api.pushover.net/1/messages.json",
-                    data=data,
-                    timeout=10.0,
-                )
-                return response.status_code == 200
-        except httpx.HTTPError:
-            return False
+        return self.client.post("https://api.pushover.net/1/messages.json", data=data)
 
 
 class TelegramProvider(NotificationProvider):
-    def __init__(self, bot_token: str, chat_id: str):
+    name = "telegram"
+
+    def __init__(self, bot_token: str, chat_id: str, timeout: float = 10.0):
+        self.timeout = timeout
         self.bot_token = bot_token
         self.chat_id = chat_id
 
-    def send(self, message: str, title: str | None = None) -> bool:
-        text = f"*{title}*\n{message}" if title else message
+    def request(self, message: str, title: str | None = None) -> httpx.Response:
         url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-        try:
-            with httpx.Client() as client:
-                response = client.post(
-                    url,
-                    data={"chat_id": self.chat_id, "text": text, "parse_mode": "Markdown"},
-                    timeout=10.0,
-                )
-                return response.status_code == 200
-        except httpx.HTTPError:
-            return False
+        text = f"*{title}*\n{message}" if title else message
+        response = self.client.post(
+            url, data={"chat_id": self.chat_id, "text": text, "parse_mode": "Markdown"}
+        )
+        if response.status_code == 400:
+            # A stray _ or * (common in logs) is a Markdown parse error; send it plain.
+            text = f"{title}\n{message}" if title else message
+            response = self.client.post(url, data={"chat_id": self.chat_id, "text": text})
+        return response
+
+
+@dataclass
+class Attempt:
+    provider: str
+    ok: bool
+    # None if the send was still in flight when the result was decided.
+    duration: float | None
+    rejected: bool = False
+
+    def to_dict(self) -> dict:
+        ms = None if self.duration is None else round(self.duration * 1000, 1)
+        return {"provider": self.provider, "ok": self.ok, "ms": ms}
+
+
+@dataclass
+class Delivery:
+    ok: bool
+    attempts: list[Attempt] = field(default_factory=list)
+
+    @property
+    def rejected(self) -> bool:
+        """Failed, and every provider refused the message outright."""
+        return not self.ok and bool(self.attempts) and all(a.rejected for a in self.attempts)
+
+    def to_dict(self) -> dict:
+        return {"ok": self.ok, "providers": [a.to_dict() for a in self.attempts]}
+
+
+class FanoutNotifier:
+    """Sends through several providers according to `policy`.
+
+    - all: send to every provider at once; delivered if any succeeded.
+    - first_success: send to every provider at once and return as soon as
+      one succeeds, cancelling sends that haven't started. Ones already in
+      flight can't be interrupted; they finish in the background.
+    - failover: try providers in order, each given `timeout` seconds,
+      moving on when one fails or runs out of time.
+
+    Every send records its latency per provider, including ones that
+    finish after the result was decided.
+    """
+
+    def __init__(self, providers: list[NotificationProvider], policy: str = "all"):
+        if policy not in NOTIFICATION_POLICIES:
+            choices = ", ".join(NOTIFICATION_POLICIES)
+            raise ValueError(f"Unknown notification policy: {policy} (choose from {choices})")
+        if not providers:
+            raise ValueError("No notification providers configured")
+        self.providers = providers
+        self.policy = policy
+        self.name = ",".join(p.name for p in providers)
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=len(self.providers), thread_name_prefix="tailcode-notify"
+                    )
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        for provider in self.providers:
+            provider.close()
+
+    def send(self, message: str, title: str | None = None) -> bool:
+        return self.deliver(message, title).ok
+
+    def deliver(self, message: str, title: str | None = None) -> Delivery:
+        if len(self.providers) == 1:
+            attempt = _attempt(self.providers[0], message, title)
+            return Delivery(attempt.ok, [attempt])
+        if self.policy == "failover":
+            return self._failover(message, title)
+
+        futures = {self.executor.submit(_attempt, p, message, title): p for p in self.providers}
+        pending = set(futures)
+        done_in_order: list = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            done_in_order.extend(done)
+            if self.policy == "first_success" and any(f.result().ok for f in done):
+                for f in pending:
+                    f.cancel()
+                break
 
+        attempts = [f.result() for f in done_in_order]
+        attempts += [Attempt(futures[f].name, False, None) for f in pending]
+        return Delivery(any(a.ok for a in attempts), attempts)
 
-def get_notifier(config: Config) -> NotificationProvider:
-    provider = config.notifications.provider
+    def _failover(self, message: str, title: str | None) -> Delivery:
+        attempts = []
+        for provider in self.providers:
+            future = self.executor.submit(_attempt, provider, message, title)
+            done, _ = wait([future], timeout=provider.timeout)
+            if not done:
+                attempts.append(Attempt(provider.name, False, None))
+                continue
+            attempt = future.result()
+            attempts.append(attempt)
+            if attempt.ok:
+                return Delivery(True, attempts)
+        return Delivery(False, attempts)
 
-    if provider == "ntfy":
+
+def _attempt(provider: NotificationProvider, message: str, title: str | None) -> Attempt:
+    from tailcode.metrics import NOTIFICATIONS, NOTIFY_DURATION
+
+    start = time.monotonic()
+    try:
+        result = provider.attempt(message, title)
+    except Exception:
+        result = RETRY
+    duration = time.monotonic() - start
+    NOTIFY_DURATION.observe(provider.name, value=duration)
+    NOTIFICATIONS.inc(provider.name, {OK: "ok", RETRY: "failed", REJECTED: "rejected"}[result])
+    return Attempt(provider.name, result == OK, duration, rejected=result == REJECTED)
+
+
+# Notifiers for the most recent notification settings; older ones are
+# closed once sends already under way have had time to finish.
+MAX_NOTIFIERS = 2
+CLOSE_GRACE = 60.0
+
+_notifiers: dict[str, FanoutNotifier] = {}
+_notifiers_lock = threading.Lock()
+
+
+def get_notifier(config: Config) -> FanoutNotifier:
+    """The notifier for `config`, reused while its notification settings don't change."""
+    key = repr(config.notifications)
+    with _notifiers_lock:
+        notifier = _notifiers.pop(key, None)
+        if notifier is None:
+            notifier = _build_notifier(config)
+        _notifiers[key] = notifier
+        while len(_notifiers) > MAX_NOTIFIERS:
+            stale = _notifiers.pop(next(iter(_notifiers)))
+            timer = threading.Timer(CLOSE_GRACE, stale.close)
+            timer.daemon = True
+            timer.start()
+    return notifier
+
+
+def _build_notifier(config: Config) -> FanoutNotifier:
+    notifications = config.notifications
+    providers = [build_provider(name, config) for name in notifications.provider_names]
+    return FanoutNotifier(providers, notifications.policy)
+
+
+def build_provider(name: str, config: Config) -> NotificationProvider:
+    notifications = config.notifications
+
+    def timeout(section) -> float:
+        return section.timeout if section.timeout is not None else notifications.timeout
+
+    if name == "ntfy":
         return NtfyProvider(
-            server=config.notifications.ntfy.server,
-            topic=config.notifications.ntfy.topic,
+            server=notifications.ntfy.server,
+            topic=notifications.ntfy.topic,
+            timeout=timeout(notifications.ntfy),
         )
-    elif provider == "pushover":
+    elif name == "pushover":
         return PushoverProvider(
-            app_token=config.notifications.pushover.app_token,
-            user_key=config.notifications.pushover.user_key,
+            app_token=notifications.pushover.app_token,
+            user_key=notifications.pushover.user_key,
+            timeout=timeout(notifications.pushover),
         )
-    elif provider == "telegram":
+    elif name == "telegram":
         return TelegramProvider(
-            bot_token=config.notifications.telegram.bot_token,
-            chat_id=config.notifications.telegram.chat_id,
+            bot_token=notifications.telegram.bot_token,
+            chat_id=notifications.telegram.chat_id,
+            timeout=timeout(notifications.telegram),
         )
     else:
-        raise ValueError(f"Unknown notification provider: {provider}")
+        raise ValueError(f"Unknown notification provider: {name}")
 
 
-def notify(message: str, title: str | None = None, config: Config | None = None) -> bool:
+def _load_default_config() -> Config:
+    from tailcode.config import load_config
+
+    return load_config()
+
+
+def deliver(message: str, title: str | None = None, config: Config | None = None) -> Delivery:
+    """Send now and report how each provider did."""
     if config is None:
-        from tailcode.config import load_config
+        config = _load_default_config()
+    return get_notifier(config).deliver(message, title)
+
+
+def notify(message: str, title: str | None = None, config: Config | None = None) -> bool:
+    """Send now and report whether it was delivered."""
+    return deliver(message, title, config).ok
+
+
+@dataclass
+class _Pending:
+    message: str
+    title: str | None
+    count: int = 1
+
+    @property
+    def key(self) -> tuple:
+        return self.message, self.title
+
+    @property
+    def text(self) -> str:
+        return f"{self.message} (×{self.count})" if self.count > 1 else self.message
+
+
+class NotificationDispatcher:
+    """Delivers notifications from a background thread so callers never wait.
+
+    Messages are queued in memory (up to `maxsize`; beyond that they're
+    dropped). The worker merges identical messages arriving within `window`
+    seconds of the first, writes the batch to the outbox, and then delivers
+    the outbox oldest first. When a send fails, delivery pauses, since
+    later messages shouldn't overtake it. It is retried after each of
+    `retry_delays` in turn, then every last delay. An entry every provider
+    rejects outright (a 4xx), or that has failed `max_attempts` times or is
+    older than `max_age` seconds, is moved to the outbox's dead-letter file
+    and the ones behind it go ahead. Anything undelivered at exit stays in
+    the outbox for the next tailcode process.
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox | None = None,
+        window: float = COALESCE_WINDOW,
+        maxsize: int = QUEUE_SIZE,
+        retry_delays: tuple[float, ...] = RETRY_DELAYS,
+        idle_poll: float = IDLE_POLL,
+        max_attempts: int = MAX_ATTEMPTS,
+        max_age: float = MAX_AGE,
+    ):
+        self.outbox = outbox if outbox is not None else Outbox(None)
+        self.window = window
+        self.retry_delays = retry_delays
+        self.idle_poll = idle_poll
+        self.max_attempts = max_attempts
+        self.max_age = max_age
+        self._config: Config | None = None
+        self._failures = 0
+        # Failed attempts per outbox entry, for this process only.
+        self._attempts: dict[str, int] = {}
+        self._retry_at: float | None = None
+        self._queue: queue.Queue[_Pending] = queue.Queue(maxsize)
+        self._flushing = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self, config: Config | None = None) -> None:
+        """Start the worker now, e.g. to deliver what a previous run left behind."""
+        if config is not None:
+            self._config = config
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="tailcode-notify", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, message: str, title: str | None = None, config: Config | None = None) -> bool:
+        """Queue a message; returns False if it was dropped because the queue is full."""
+        self.start(config)
+        try:
+            self._queue.put_nowait(_Pending(message, title))
+            return True
+        except queue.Full:
+            from tailcode.metrics import NOTIFICATIONS
+
+            providers = self._current_config().notifications.provider_names
+            NOTIFICATIONS.inc(",".join(providers), "dropped")
+            return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Persist and try once to send what's queued, without waiting out the window.
+
+        Returns True if the queue was handled within `timeout`; whatever
+        couldn't be delivered is left in the outbox.
+        """
+        self._flushing.set()
+        try:
+            deadline = time.monotonic() + timeout
+            while self._queue.unfinished_tasks and time.monotonic() < deadline:
+                time.sleep(0.02)
+            return not self._queue.unfinished_tasks
+        finally:
+            self._flushing.clear()
+
+    def _current_config(self) -> Config:
+        if self._config is None:
+            self._config = _load_default_config()
+        return self._config
+
+    def _collect(self, timeout: float) -> list[_Pending]:
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.window
+        while not self._flushing.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.05)))
+            except queue.Empty:
+                pass
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _give_up(self, entry: dict, rejected: bool) -> str | None:
+        """Why `entry` should go to the dead-letter file, or None to retry it."""
+        if rejected:
+            return "rejected"
+        attempts = self._attempts[entry["id"]] = self._attempts.get(entry["id"], 0) + 1
+        if attempts >= self.max_attempts:
+            return "attempts"
+        if time.time() - entry.get("at", time.time()) > self.max_age:
+            return "expired"
+        return None
+
+    def _drain(self) -> None:
+        """Send pending outbox entries in order, stopping at the first failure to retry."""
+        with self.outbox.drain_lock() as ours:
+            if not ours:
+                # Another process is delivering; check back later.
+                return
+            delivered: list[str] = []
+            dead: dict[str, list[dict]] = {}
+            try:
+                notifier = get_notifier(self._current_config())
+                for entry in self.outbox.pending():
+                    delivery = notifier.deliver(entry["message"], entry["title"])
+                    if delivery.ok:
+                        delivered.append(entry["id"])
+                        self._attempts.pop(entry["id"], None)
+                        continue
+                    reason = self._give_up(entry, delivery.rejected)
+                    if reason is not None:
+                        dead.setdefault(reason, []).append(entry)
+                        self._attempts.pop(entry["id"], None)
+                        continue
+                    self._failures += 1
+                    delay = self.retry_delays[min(self._failures, len(self.retry_delays)) - 1]
+                    self._retry_at = time.monotonic() + delay
+                    return
+                self._failures = 0
+                self._retry_at = None
+            finally:
+                self.outbox.mark_done(delivered)
+                for reason, entries in dead.items():
+                    self._bury(entries, reason)
+
+    def _bury(self, entries: list[dict], reason: str) -> None:
+        from tailcode.metrics import NOTIFICATIONS
+
+        self.outbox.mark_dead(entries, reason)
+        providers = self._current_config().notifications.provider_names
+        NOTIFICATIONS.inc(",".join(providers), "dead", amount=len(entries))
+
+    def _run(self) -> None:
+        self._drain_safely()
+        while True:
+            if self._retry_at is None:
+                timeout = self.idle_poll
+            else:
+                timeout = max(0.0, self._retry_at - time.monotonic())
+            batch = self._collect(timeout)
+            if batch:
+                merged: dict[tuple, _Pending] = {}
+                for pending in batch:
+                    if pending.key in merged:
+                        merged[pending.key].count += 1
+                    else:
+                        merged[pending.key] = pending
+                try:
+                    self.outbox.append([(p.text, p.title) for p in merged.values()])
+                except OSError:
+                    pass
+            # A new batch waits behind a failing entry until its retry is due.
+            due = self._retry_at is None or time.monotonic() >= self._retry_at
+            if (due or self._flushing.is_set()) and self.outbox.has_pending():
+                self._drain_safely()
+            for _ in batch:
+                self._queue.task_done()
+
+    def _drain_safely(self) -> None:
+        try:
+            self._drain()
+        except Exception:
+            pass
+
+
+_dispatcher: NotificationDispatcher | None = None
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        from tailcode.cache import get_cache_dir
+
+        _dispatcher = NotificationDispatcher(Outbox(get_cache_dir() / OUTBOX_FILE))
+        atexit.register(_dispatcher.flush)
+    return _dispatcher
 
-        config = load_config()
 
-    notifier = get_notifier(config)
-    return notifier.send(message, title)
+def notify_async(message: str, title: str | None = None, config: Config | None = None) -> bool:
+    """Queue a notification for background delivery; never waits on the network."""
+    return get_dispatcher().submit(message, title, config)
@@ -0,0 +1,161 @@
+"""Durable queue of notifications waiting to be delivered.
+
+An append-only JSON-lines file of `add` and `done` records, shared by every
+tailcode process. Appends for a batch go out with one fsync. Once
+everything is delivered the file is truncated, and while some entries are
+still pending it is rewritten without the delivered ones once enough have
+piled up. Entries that will never be delivered are moved to a separate
+dead-letter file so they stop holding up the rest.
+"""
+import fcntl
+import json
+import os
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+OUTBOX_FILE = "outbox.jsonl"
+DEAD_FILE = "outbox.dead.jsonl"
+# Once the dead-letter file is bigger than this, its older half is dropped.
+DEAD_MAX_BYTES = 1024 * 1024
+# Rewrite the file once this many delivered entries are in it.
+COMPACT_AFTER = 256
+
+
+class Outbox:
+    """Pending notifications in arrival order; in memory only if `path` is None."""
+
+    def __init__(self, path: Path | None, compact_after: int = COMPACT_AFTER):
+        self.path = path
+        self.compact_after = compact_after
+        self._memory: list[dict] = []
+        self.dead: list[dict] = []
+        self._drain_lock_file = None
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with open(self.path.with_suffix(".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write(self, records: list[dict], sync: bool) -> None:
+        with open(self.path, "a") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records))
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+
+    def _read(self) -> tuple[list[dict], int]:
+        """Pending entries in order, and how many delivered entries the file holds."""
+        try:
+            lines = self.path.read_text().splitlines()
+        except OSError:
+            return [], 0
+        entries: dict[str, dict] = {}
+        done = 0
+        for line in lines:
+            try:
+                record = json.loads(line)
+                op, entry_id = record["op"], record["id"]
+            except (ValueError, KeyError, TypeError):
+                # A torn last line from a crash mid-write.
+                continue
+            if op == "add":
+                entries[entry_id] = record
+            elif op == "done" and entries.pop(entry_id, None) is not None:
+                done += 1
+        return list(entries.values()), done
+
+    def append(self, messages: list[tuple[str, str | None]]) -> list[dict]:
+        """Add `(message, title)` pairs durably; returns the new entries."""
+        entries = [
+            {"op": "add", "id": uuid.uuid4().hex[:16], "at": time.time(), "message": m, "title": t}
+            for m, t in messages
+        ]
+        if self.path is None:
+            self._memory.extend(entries)
+            return entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            self._write(entries, sync=True)
+        return entries
+
+    def pending(self) -> list[dict]:
+        if self.path is None:
+            return list(self._memory)
+        if not self.has_pending():
+            return []
+        with self._locked():
+            return self._read()[0]
+
+    def has_pending(self) -> bool:
+        """Cheap check that doesn't read the file."""
+        if self.path is None:
+            return bool(self._memory)
+        try:
+            return self.path.stat().st_size > 0
+        except OSError:
+            return False
+
+    def mark_done(self, ids: list[str]) -> None:
+        """Record deliveries (one fsync for the lot) and compact if worthwhile."""
+        if not ids:
+            return
+        if self.path is None:
+            self._memory = [e for e in self._memory if e["id"] not in ids]
+            return
+        with self._locked():
+            self._write([{"op": "done", "id": i} for i in ids], sync=True)
+            pending, done = self._read()
+            if not pending:
+                with open(self.path, "w") as f:
+                    os.fsync(f.fileno())
+            elif done >= self.compact_after:
+                tmp = self.path.with_suffix(".tmp")
+                with open(tmp, "w") as f:
+                    f.write("".join(json.dumps(e) + "\n" for e in pending))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+
+    def mark_dead(self, entries: list[dict], reason: str) -> None:
+        """Give up on `entries`: keep them in the dead-letter file and drop them from the queue."""
+        if not entries:
+            return
+        records = [{**e, "op": "dead", "reason": reason, "dead_at": time.time()} for e in entries]
+        if self.path is None:
+            self.dead.extend(records)
+        else:
+            dead_path = self.path.with_name(DEAD_FILE)
+            with self._locked():
+                with open(dead_path, "a") as f:
+                    f.write("".join(json.dumps(r) + "\n" for r in records))
+                if dead_path.stat().st_size > DEAD_MAX_BYTES:
+                    lines = dead_path.read_text().splitlines(keepends=True)
+                    tmp = dead_path.with_suffix(".tmp")
+                    tmp.write_text("".join(lines[len(lines) // 2:]))
+                    os.replace(tmp, dead_path)
+        self.mark_done([e["id"] for e in entries])
+
+    @contextmanager
+    def drain_lock(self) -> Iterator[bool]:
+        """Yield True if this process may deliver now (only one drains at a time)."""
+        if self.path is None:
+            yield True
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name("drain.lock"), "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
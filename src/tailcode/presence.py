@@ -0,0 +1,130 @@
+"""Background presence poller that publishes device online/offline changes."""
+import queue
+import threading
+import time
+from collections.abc import Callable
+
+from tailcode.config import Config
+from tailcode.tailscale import TailscaleStatus, get_status_snapshot
+
+
+class Subscription:
+    def __init__(self, maxsize: int):
+        self.events: queue.Queue[tuple[str, object] | None] = queue.Queue(maxsize)
+
+    def get(self, timeout: float) -> tuple[str, object] | None:
+        """Next `(event, data)`, None once dropped; raises queue.Empty on timeout."""
+        return self.events.get(timeout=timeout)
+
+
+class PresenceMonitor:
+    """Polls tailscale status and fans out per-device changes to subscribers.
+
+    There is one poll loop however many subscribers there are. It only runs
+    while someone is subscribed or `touch()` was called in the last
+    `idle_after` seconds, so an unwatched server stays quiet.
+    """
+
+    def __init__(
+        self,
+        get_config: Callable[[], Config],
+        interval: float = 5.0,
+        idle_after: float = 60.0,
+        queue_size: int = 256,
+    ):
+        self.get_config = get_config
+        self.interval = interval
+        self.idle_after = idle_after
+        self.queue_size = queue_size
+        self.state: dict[str, bool] = {}
+        self.last_snapshot: TailscaleStatus | None = None
+        self._last_demand = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._subscribers: set[Subscription] = set()
+        self._thread = threading.Thread(target=self._run, name="tailcode-presence", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def touch(self) -> None:
+        """Note that someone wants fresh presence data."""
+        idle = not self._active()
+        self._last_demand = time.monotonic()
+        if idle:
+            self._wake.set()
+
+    def snapshot(self, max_age: float) -> TailscaleStatus | None:
+        snapshot = self.last_snapshot
+        if snapshot is not None and snapshot.age <= max_age:
+            return snapshot
+        return None
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self.queue_size)
+        idle = not self._active()
+        with self._lock:
+            if self.state:
+                sub.events.put_nowait(("snapshot", dict(self.state)))
+            self._subscribers.add(sub)
+        if idle:
+            self._wake.set()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def _active(self) -> bool:
+        return bool(self._subscribers) or time.monotonic() - self._last_demand < self.idle_after
+
+    def _publish(self, event: str, data: object) -> None:
+        with self._lock:
+            for sub in list(self._subscribers):
+                try:
+                    sub.events.put_nowait((event, data))
+                except queue.Full:
+                    # A subscriber this far behind is dropped; it can reconnect
+                    # and get a fresh snapshot.
+                    self._subscribers.discard(sub)
+                    while True:
+                        try:
+                            sub.events.get_nowait()
+                        except queue.Empty:
+                            break
+                    sub.events.put_nowait(None)
+
+    def poll(self) -> list[dict]:
+        """Take one snapshot, update state, and publish what changed."""
+        snapshot = get_status_snapshot()
+        self.last_snapshot = snapshot
+        config = self.get_config()
+        current = {name: snapshot.is_online(d.hostname) for name, d in config.devices.items()}
+
+        changes = []
+        with self._lock:
+            for name, online in current.items():
+                if self.state.get(name) != online:
+                    changes.append({
+                        "device": name,
+                        "hostname": config.devices[name].hostname,
+                        "online": online,
+                        "at": snapshot.fetched_at,
+                    })
+            for name in self.state.keys() - current.keys():
+                changes.append({"device": name, "removed": True, "at": snapshot.fetched_at})
+            self.state = current
+        for change in changes:
+            self._publish("presence", change)
+        return changes
+
+    def _run(self) -> None:
+        while True:
+            if not self._active():
+                self._wake.wait()
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception:
+                pass
+            time.sleep(self.interval)
@@ -0,0 +1,146 @@
+"""Layered reachability probes, cheapest first."""
+import socket
+import time
+from dataclasses import dataclass, field
+
+from tailcode.config import Config, Device
+from tailcode.tailscale import TailscaleStatus, get_status_snapshot
+
+STAGES = ("tailscale", "tcp", "banner", "login")
+SSH_PORT = 22
+
+DEFAULT_TIMEOUTS = {
+    "tcp": 1.0,
+    "banner": 2.0,
+    "login": 5.0,
+}
+
+
+@dataclass
+class ProbeStage:
+    name: str
+    ok: bool
+    duration: float
+    detail: str = ""
+
+
+@dataclass
+class ProbeResult:
+    device: str
+    stages: list[ProbeStage] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.stages) and all(s.ok for s in self.stages)
+
+    @property
+    def reached(self) -> str | None:
+        """Name of the last stage that passed."""
+        passed = [s.name for s in self.stages if s.ok]
+        return passed[-1] if passed else None
+
+    @property
+    def duration(self) -> float:
+        return sum(s.duration for s in self.stages)
+
+    def to_dict(self) -> dict:
+        return {
+            "device": self.device,
+            "ok": self.ok,
+            "reached": self.reached,
+            "stages": [
+                {"name": s.name, "ok": s.ok, "ms": round(s.duration * 1000, 1), "detail": s.detail}
+                for s in self.stages
+            ],
+        }
+
+
+def _tcp_connect(address: str, timeout: float) -> socket.socket:
+    return socket.create_connection((address, SSH_PORT), timeout=timeout)
+
+
+def _read_banner(sock: socket.socket, timeout: float) -> str:
+    sock.settimeout(timeout)
+    data = b""
+    while b"\n" not in data and len(data) < 256:
+        chunk = sock.recv(256)
+        if not chunk:
+            break
+        data += chunk
+    return data.split(b"\n", 1)[0].decode(errors="replace").strip()
+
+
+def probe(
+    device: Device,
+    config: Config,
+    snapshot: TailscaleStatus | None = None,
+    until: str = "login",
+    timeouts: dict[str, float] | None = None,
+) -> ProbeResult:
+    """Run stages in order up to `until`, stopping at the first that fails.
+
+    A device still booting fails at `tailscale` or `tcp` in milliseconds
+    instead of burning a full SSH login timeout.
+    """
+    from tailcode import telemetry
+
+    result = _run_stages(device, config, snapshot, until, timeouts)
+    telemetry.record(
+        "probe", device.name, ok=result.ok, duration=result.duration, detail=result.reached
+    )
+    return result
+
+
+def _run_stages(
+    device: Device,
+    config: Config,
+    snapshot: TailscaleStatus | None,
+    until: str,
+    timeouts: dict[str, float] | None,
+) -> ProbeResult:
+    timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+    last = STAGES.index(until)
+    result = ProbeResult(device=device.name)
+
+    def record(name: str, start: float, ok: bool, detail: str = "") -> bool:
+        result.stages.append(ProbeStage(name, ok, time.monotonic() - start, detail))
+        return ok and STAGES.index(name) < last
+
+    start = time.monotonic()
+    if snapshot is None:
+        snapshot = get_status_snapshot()
+    peer = snapshot.find_peer(device.hostname)
+    if snapshot.available:
+        online = bool(peer and peer.online)
+        if not record("tailscale", start, online, "online" if online else "offline"):
+            return result
+    elif not record("tailscale", start, True, "status unavailable"):
+        return result
+
+    # Connect to the tailscale IP when we have it, so a stale MagicDNS
+    # answer can't send us somewhere else.
+    address = peer.ips[0] if peer and peer.ips else device.hostname
+    start = time.monotonic()
+    try:
+        sock = _tcp_connect(address, timeouts["tcp"])
+    except OSError as e:
+        record("tcp", start, False, str(e) or type(e).__name__)
+        return result
+
+    with sock:
+        if not record("tcp", start, True, f"{address}:{SSH_PORT}"):
+            return result
+        start = time.monotonic()
+        try:
+            banner = _read_banner(sock, timeouts["banner"])
+        except OSError as e:
+            record("banner", start, False, str(e) or type(e).__name__)
+            return result
+        if not record("banner", start, banner.startswith("SSH-"), banner[:80]):
+            return result
+
+    from tailcode.ssh import is_reachable
+
+    start = time.monotonic()
+    record("login", start, is_reachable(device, config, timeout=int(timeouts["login"])))
+    return result
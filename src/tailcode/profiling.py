@@ -0,0 +1,163 @@
+"""Hooks that report every subprocess.run and httpx request.
+
+Nothing is patched until the first listener is added, so there is no cost
+unless profiling (or metrics) is on. Profiler collects calls for
+`--profile` and for tests:
+
+    with Profiler() as prof:
+        tc_status()
+    assert prof.count("subprocess", "tailscale status") == 1
+"""
+import os
+import subprocess
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import httpx
+
+
+@dataclass(slots=True)
+class Call:
+    kind: str
+    target: str
+    group: str
+    duration: float
+    ok: bool
+
+
+Listener = Callable[[Call], None]
+
+_listeners: list[Listener] = []
+_lock = threading.Lock()
+_originals: dict[str, Callable] = {}
+
+
+def _emit(call: Call) -> None:
+    for listener in list(_listeners):
+        try:
+            listener(call)
+        except Exception:
+            pass
+
+
+def _command_group(argv) -> str:
+    if isinstance(argv, str):
+        argv = argv.split()
+    argv = [str(a) for a in argv]
+    if not argv:
+        return ""
+    group = os.path.basename(argv[0])
+    if len(argv) > 1 and not argv[1].startswith("-"):
+        group += f" {argv[1]}"
+    return group
+
+
+def _run(*popenargs, **kwargs):
+    argv = popenargs[0] if popenargs else kwargs.get("args", ())
+    start = time.monotonic()
+    ok = False
+    try:
+        result = _originals["run"](*popenargs, **kwargs)
+        ok = result.returncode == 0
+        return result
+    finally:
+        target = argv if isinstance(argv, str) else " ".join(str(a) for a in argv)
+        _emit(Call("subprocess", target, _command_group(argv), time.monotonic() - start, ok))
+
+
+def _send(self, request, *args, **kwargs):
+    start = time.monotonic()
+    ok = False
+    try:
+        response = _originals["send"](self, request, *args, **kwargs)
+        ok = response.status_code < 400
+        return response
+    finally:
+        url = request.url
+        group = f"{request.method} {url.host or 'local'}{url.path}"
+        _emit(Call("http", f"{request.method} {url}", group, time.monotonic() - start, ok))
+
+
+def _install() -> None:
+    if _originals:
+        return
+    _originals["run"] = subprocess.run
+    _originals["send"] = httpx.Client.send
+    subprocess.run = _run
+    httpx.Client.send = _send
+
+
+def _uninstall() -> None:
+    if not _originals:
+        return
+    subprocess.run = _originals.pop("run")
+    httpx.Client.send = _originals.pop("send")
+
+
+def add_listener(listener: Listener) -> None:
+    with _lock:
+        _install()
+        _listeners.append(listener)
+
+
+def remove_listener(listener: Listener) -> None:
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+        if not _listeners:
+            _uninstall()
+
+
+def enabled_from_env() -> bool:
+    return os.environ.get("TAILCODE_PROFILE", "") not in ("", "0", "false", "no")
+
+
+class Profiler:
+    """Collects every call made while it is active."""
+
+    def __init__(self):
+        self.calls: list[Call] = []
+        self.started = time.monotonic()
+        self.stopped: float | None = None
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self.started = time.monotonic()
+        add_listener(self.calls.append)
+
+    def stop(self) -> None:
+        remove_listener(self.calls.append)
+        self.stopped = time.monotonic()
+
+    @property
+    def wall_time(self) -> float:
+        return (self.stopped or time.monotonic()) - self.started
+
+    def count(self, kind: str | None = None, group: str | None = None) -> int:
+        return sum(
+            1
+            for c in self.calls
+            if (kind is None or c.kind == kind) and (group is None or c.group == group)
+        )
+
+    def summary(self) -> list[dict]:
+        """One row per (kind, group), slowest total first."""
+        rows: dict[tuple[str, str], dict] = {}
+        for c in self.calls:
+            row = rows.setdefault(
+                (c.kind, c.group),
+                {"kind": c.kind, "group": c.group, "calls": 0, "failed": 0, "total": 0.0, "max": 0.0},
+            )
+            row["calls"] += 1
+            row["failed"] += not c.ok
+            row["total"] += c.duration
+            row["max"] = max(row["max"], c.duration)
+        return sorted(rows.values(), key=lambda r: r["total"], reverse=True)
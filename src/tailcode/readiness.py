@@ -0,0 +1,105 @@
+"""Shared per-device readiness watchers for long-polling clients."""
+import threading
+import time
+from collections.abc import Callable
+
+from tailcode.config import Device
+
+
+class ReadinessWatcher:
+    """Probes one device on a fixed interval until it is ready.
+
+    Any number of callers can `wait()` on the same watcher; the device is
+    probed once per interval no matter how many are waiting. The watcher
+    stops when the device is ready or when its last waiter gives up.
+    """
+
+    def __init__(
+        self,
+        device: Device,
+        probe: Callable[[Device], bool],
+        interval: float = 3.0,
+        on_exit: Callable[["ReadinessWatcher"], None] | None = None,
+    ):
+        self.device = device
+        self.probe = probe
+        self.interval = interval
+        self.on_exit = on_exit
+        self.ready = False
+        self.probes = 0
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._waiters = 0
+        self._thread = threading.Thread(
+            target=self._run, name=f"tailcode-ready-{device.name}", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def acquire(self) -> bool:
+        """Register a waiter; False if the watcher has already stopped."""
+        with self._lock:
+            if self._done.is_set():
+                return False
+            self._waiters += 1
+            return True
+
+    def wait(self, timeout: float) -> bool:
+        """Block until ready or `timeout`; the caller must have called acquire()."""
+        try:
+            self._done.wait(timeout)
+            return self.ready
+        finally:
+            with self._lock:
+                self._waiters -= 1
+
+    def _run(self) -> None:
+        try:
+            while True:
+                self.probes += 1
+                try:
+                    ready = self.probe(self.device)
+                except Exception:
+                    ready = False
+                with self._lock:
+                    if ready or self._waiters == 0:
+                        self.ready = ready
+                        self._done.set()
+                        return
+                time.sleep(self.interval)
+        finally:
+            if self.on_exit:
+                self.on_exit(self)
+
+
+class ReadinessRegistry:
+    """Hands out one live ReadinessWatcher per device name."""
+
+    def __init__(self, probe: Callable[[Device], bool], interval: float = 3.0):
+        self.probe = probe
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._watchers: dict[str, ReadinessWatcher] = {}
+
+    def wait(self, device: Device, timeout: float) -> bool:
+        with self._lock:
+            watcher = self._watchers.get(device.name)
+            if watcher is not None and not watcher.acquire():
+                # It stopped between probes; a stop on success is still news.
+                if watcher.ready:
+                    return True
+                watcher = None
+            if watcher is None:
+                watcher = ReadinessWatcher(
+                    device, self.probe, interval=self.interval, on_exit=self._remove
+                )
+                watcher.acquire()
+                self._watchers[device.name] = watcher
+                watcher.start()
+        return watcher.wait(timeout)
+
+    def _remove(self, watcher: ReadinessWatcher) -> None:
+        with self._lock:
+            if self._watchers.get(watcher.device.name) is watcher:
+                del self._watchers[watcher.device.name]
@@ -0,0 +1,178 @@
+"""Detached jobs: commands left running in a tmux window on a device.
+
+Each job runs in its own window of the `config.ssh.jobs_session` tmux
+session. Its output is teed to ~/.cache/tailcode/jobs/<name>.log on the
+device and its exit status written to <name>.exit, so a job survives the
+SSH connection that started it. When it finishes, the device sends the
+exit status and the end of the log with its own `tc notify`.
+"""
+import re
+import shlex
+import subprocess
+import uuid
+from dataclasses import dataclass
+
+from tailcode.config import Config, Device
+from tailcode.ssh import ssh_attach, ssh_exec
+
+# Relative to $HOME on the device.
+JOBS_DIR = ".cache/tailcode/jobs"
+TAIL_LINES = 15
+# tmux is started from a non-login SSH command, whose PATH usually lacks
+# user-installed tools (tc included).
+EXTRA_PATH = "$HOME/.local/bin:/opt/homebrew/bin:/usr/local/bin"
+
+# No "." or ":": tmux would read them as part of a session:window.pane target.
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+@dataclass
+class RemoteJob:
+    name: str
+    # running, finished, or lost (no exit status and no window, e.g. after a reboot)
+    state: str
+    exit_code: int | None
+    started: int | None
+    command: str
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "exit_code": self.exit_code,
+            "started": self.started,
+            "command": self.command,
+        }
+
+
+def job_name(command: str) -> str:
+    """A default name: the command's first word and a short random suffix."""
+    words = command.split()
+    stem = words[0].rsplit("/", 1)[-1] if words else ""
+    stem = re.sub(r"[^A-Za-z0-9_-]", "", re.sub(r"[.:]", "-", stem)).lstrip("_-")[:24]
+    return f"{stem or 'job'}-{uuid.uuid4().hex[:4]}"
+
+
+def valid_name(name: str) -> bool:
+    return bool(_NAME.match(name))
+
+
+def _sh(script: str) -> str:
+    # The login shell on the device may not be POSIX (zsh aborts on an
+    # unmatched glob), so scripts always go through sh.
+    return f"sh -c {shlex.quote(script)}"
+
+
+def _job_script(device: Device, name: str, command: str, tail_lines: int) -> str:
+    """What runs inside the job's tmux window."""
+    done = shlex.quote(f"{name} done on {device.name}")
+    failed = shlex.quote(f"{name} failed on {device.name}")
+    return (
+        f'PATH="{EXTRA_PATH}:$PATH"; dir="$1"\n'
+        f"{{ ( {command}\n"
+        f'); echo $? > "$dir/{name}.exit"; }} 2>&1 | tee "$dir/{name}.log"\n'
+        f'status=$(cat "$dir/{name}.exit" 2>/dev/null || echo 1)\n'
+        f'if [ "$status" = 0 ]; then title={done}; else title={failed}" (exit $status)"; fi\n'
+        f'out=$(tail -n {tail_lines} "$dir/{name}.log")\n'
+        f'tc notify -t "$title" "${{out:-no output}}" >/dev/null 2>&1\n'
+    )
+
+
+def start_job(
+    device: Device, config: Config, command: str, name: str, tail_lines: int = TAIL_LINES
+) -> dict:
+    """Start `command` in a new tmux window on `device` and return without waiting."""
+    if not valid_name(name):
+        return {"ok": False, "error": f"Invalid job name: {name}"}
+    session = shlex.quote(config.ssh.jobs_session)
+    # The window inherits the tmux server's environment, not this shell's,
+    # so the jobs directory is passed in rather than derived from $HOME.
+    script = shlex.quote(_job_script(device, name, command, tail_lines))
+    window = f'-c "$HOME" sh -c {script} job "$dir"'
+    launch = (
+        f'dir="$HOME/{JOBS_DIR}"; mkdir -p "$dir" || exit 1\n'
+        f'if [ -e "$dir/{name}.cmd" ] && [ ! -e "$dir/{name}.exit" ]; then\n'
+        f'  echo "job {name} already exists" >&2; exit 3\n'
+        f"fi\n"
+        f'rm -f "$dir/{name}.exit" "$dir/{name}.log"\n'
+        f'{{ date +%s; printf "%s\\n" {shlex.quote(command)}; }} > "$dir/{name}.cmd"\n'
+        f"if tmux has-session -t {session} 2>/dev/null; then\n"
+        f"  tmux new-window -d -t {session}: -n {name} {window}\n"
+        f"else\n"
+        f"  tmux new-session -d -s {session} -n {name} {window}\n"
+        f"fi\n"
+    )
+    try:
+        result = ssh_exec(device, config, _sh(launch))
+    except subprocess.TimeoutExpired:
+        return {"ok": False, "error": "Timed out starting the job"}
+    if result.returncode != 0:
+        return {"ok": False, "error": result.stderr.strip() or f"exit {result.returncode}"}
+    return {"ok": True, "name": name}
+
+
+def list_jobs(device: Device, config: Config) -> list[RemoteJob] | None:
+    """Jobs on `device`, oldest first; None if it couldn't be reached."""
+    session = shlex.quote(config.ssh.jobs_session)
+    script = (
+        f'dir="$HOME/{JOBS_DIR}"\n'
+        f"windows=$(tmux list-windows -t {session} -F '#W' 2>/dev/null)\n"
+        f'for f in "$dir"/*.cmd; do\n'
+        f'  [ -e "$f" ] || continue\n'
+        f'  n=$(basename "$f" .cmd)\n'
+        f'  if [ -e "$dir/$n.exit" ]; then s=$(cat "$dir/$n.exit")\n'
+        f'  elif printf "%s\\n" "$windows" | grep -qx "$n"; then s=running\n'
+        f"  else s=lost; fi\n"
+        f'  printf "%s\\t%s\\t%s\\t%s\\n" "$n" "$s" "$(sed -n 1p "$f")" "$(sed -n 2p "$f")"\n'
+        f"done\n"
+    )
+    try:
+        result = ssh_exec(device, config, _sh(script))
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0:
+        return None
+
+    jobs = []
+    for line in result.stdout.splitlines():
+        parts = line.split("\t", 3)
+        if len(parts) != 4:
+            continue
+        name, status, started, command = parts
+        if status in ("running", "lost"):
+            state, exit_code = status, None
+        else:
+            state, exit_code = "finished", int(status) if status.strip().isdigit() else None
+        jobs.append(
+            RemoteJob(name, state, exit_code, int(started) if started.isdigit() else None, command)
+        )
+    jobs.sort(key=lambda j: j.started or 0)
+    return jobs
+
+
+def job_log(
+    device: Device, config: Config, name: str, lines: int = 50
+) -> subprocess.CompletedProcess:
+    return ssh_exec(device, config, _sh(f'tail -n {lines} "$HOME/{JOBS_DIR}/{name}.log"'))
+
+
+def clear_jobs(device: Device, config: Config) -> subprocess.CompletedProcess:
+    """Forget finished and lost jobs; running ones are kept."""
+    session = shlex.quote(config.ssh.jobs_session)
+    script = (
+        f'dir="$HOME/{JOBS_DIR}"\n'
+        f"windows=$(tmux list-windows -t {session} -F '#W' 2>/dev/null)\n"
+        f'for f in "$dir"/*.cmd; do\n'
+        f'  [ -e "$f" ] || continue\n'
+        f'  n=$(basename "$f" .cmd)\n'
+        f'  printf "%s\\n" "$windows" | grep -qx "$n" && [ ! -e "$dir/$n.exit" ] && continue\n'
+        f'  rm -f "$dir/$n.cmd" "$dir/$n.exit" "$dir/$n.log"\n'
+        f"done\n"
+    )
+    return ssh_exec(device, config, _sh(script))
+
+
+def attach_job(device: Device, config: Config, name: str) -> int:
+    """Attach to the job's window; detaching (C-b d) leaves it running."""
+    target = shlex.quote(f"{config.ssh.jobs_session}:{name}")
+    return ssh_attach(device, config, f"tmux attach -t {target}")
@@ -0,0 +1,98 @@
+"""Merge duplicate concurrent operations and reuse their recent results."""
+import fcntl
+import json
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+
+def _always(result: Any) -> bool:
+    return True
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.finished_at = 0.0
+
+
+class SingleFlight:
+    """Run at most one `fn` per key at a time; concurrent callers share its result.
+
+    A finished result for which `keep(result)` is true is also handed to
+    callers arriving within `cooldown` seconds, instead of running `fn` again.
+    """
+
+    def __init__(self, cooldown: float = 0.0, keep: Callable[[Any], bool] = _always):
+        self.cooldown = cooldown
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Return `(result, shared)`, where `shared` means another call's result was reused."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and (
+                not call.done.is_set() or time.monotonic() - call.finished_at < self.cooldown
+            ):
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            call.finished_at = time.monotonic()
+            with self._lock:
+                if call.error is not None or not self.keep(call.result):
+                    self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+
+def do_across_processes(
+    lock_dir: Path,
+    key: str,
+    fn: Callable[[], dict],
+    cooldown: float,
+    keep: Callable[[dict], bool] = _always,
+) -> tuple[dict, bool]:
+    """SingleFlight.do for separate processes, using a lock file per key.
+
+    A second process blocks on the lock while the first runs `fn`, then
+    picks up its result from `<key>.json` if it is recent enough.
+    """
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    result_path = lock_dir / f"{key}.json"
+    with open(lock_dir / f"{key}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                recent = json.loads(result_path.read_text())
+                if time.time() - recent["at"] < cooldown:
+                    return recent["result"], True
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+            result = fn()
+            if keep(result):
+                result_path.write_text(json.dumps({"at": time.time(), "result": result}))
+            return result, False
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
@@ -1,15 +1,49 @@
 import subprocess
+import time
+from pathlib import Path
 
 from tailcode.config import Config, Device
 
 
+def get_control_dir() -> Path:
+    from tailcode.cache import get_cache_dir
+
+    control_dir = get_cache_dir() / "ssh"
+    control_dir.mkdir(mode=0o700, exist_ok=True)
+    return control_dir
+
+
+def _mux_options(config: Config) -> list[str]:
+    """OpenSSH options that share one master connection per destination.
+
+    `tailscale ssh` can't be multiplexed, so for tailscale we run plain ssh
+    through `tailscale nc`, the same transport `tailscale ssh` sets up. The
+    peer is already authenticated by tailscale, so a first-seen host key
+    is accepted.
+    """
+    options = [
+        "-o", "ControlMaster=auto",
+        "-o", f"ControlPath={get_control_dir()}/%C",
+        "-o", f"ControlPersist={config.ssh.control_persist}",
+    ]
+    if config.ssh.use_tailscale_ssh:
+        options += [
+            "-o", "ProxyCommand=tailscale nc %h %p",
+            "-o", "StrictHostKeyChecking=accept-new",
+        ]
+    return options
+
+
 def build_ssh_command(
     device: Device,
     config: Config,
     command: str | None = None,
     with_session: bool = False,
+    multiplex: bool = False,
 ) -> list[str]:
-    if config.ssh.use_tailscale_ssh:
+    if multiplex and config.ssh.multiplex:
+        cmd = ["ssh", *_mux_options(config)]
+    elif config.ssh.use_tailscale_ssh:
         cmd = ["tailscale", "ssh"]
     else:
         cmd = ["ssh"]
@@ -30,16 +64,62 @@ def build_ssh_command(
 
 
 def ssh_exec(device: Device, config: Config, command: str, timeout: int = 30) -> subprocess.CompletedProcess:
-    cmd = build_ssh_command(device, config, command=command)
+    cmd = build_ssh_command(device, config, command=command, multiplex=True)
     return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
 
 
-def ssh_connect(device: Device, config: Config, with_session: bool = True) -> int:
-    cmd = build_ssh_command(device, config, with_session=with_session)
+def _control_command(device: Device, config: Config, operation: str) -> subprocess.CompletedProcess:
+    cmd = build_ssh_command(device, config, multiplex=True)
+    cmd[1:1] = ["-O", operation]
+    return subprocess.run(cmd, capture_output=True, text=True, timeout=5)
+
+
+def mux_is_open(device: Device, config: Config) -> bool:
+    if not config.ssh.multiplex:
+        return False
+    try:
+        return _control_command(device, config, "check").returncode == 0
+    except (subprocess.TimeoutExpired, OSError):
+        return False
+
+
+def mux_close(device: Device, config: Config) -> bool:
+    if not config.ssh.multiplex:
+        return False
+    try:
+        return _control_command(device, config, "exit").returncode == 0
+    except (subprocess.TimeoutExpired, OSError):
+        return False
+
+
+def _run_session(device: Device, cmd: list[str]) -> int:
+    from tailcode import telemetry
+
+    start = time.monotonic()
     result = subprocess.run(cmd)
+    telemetry.record(
+        "session",
+        device.name,
+        ok=result.returncode == 0,
+        duration=time.monotonic() - start,
+        detail=f"exit {result.returncode}",
+    )
     return result.returncode
 
 
+def ssh_connect(device: Device, config: Config, with_session: bool = True) -> int:
+    cmd = build_ssh_command(device, config, with_session=with_session)
+    return _run_session(device, cmd)
+
+
+def ssh_attach(device: Device, config: Config, command: str) -> int:
+    """Run an interactive remote command, such as `tmux attach`, in a terminal."""
+    cmd = build_ssh_command(device, config, command=command)
+    if cmd[0] == "ssh":
+        cmd.insert(1, "-t")
+    return _run_session(device, cmd)
+
+
 def ssh_connect_with_command(device: Device, config: Config, command: str) -> int:
     """Connect to device with tmux session and run a command in it."""
     if config.ssh.use_tailscale_ssh:
@@ -56,8 +136,7 @@ def ssh_connect_with_command(device: Device, config: Config, command: str) -> in
     tmux_cmd = f"tmux new-session -A -s {session} \\; send-keys '{command}' Enter"
     cmd.append(tmux_cmd)
 
-    result = subprocess.run(cmd)
-    return result.returncode
+    return _run_session(device, cmd)
 
 
 def is_reachable(device: Device, config: Config, timeout: int = 5) -> bool:
@@ -0,0 +1,149 @@
+"""Follow a log stream and push the lines that match as notifications.
+
+Lines are matched against one combined regex. Matches that arrive within
+`window` seconds of each other go out as a single digest, and digests
+are rate-limited by a token bucket. A digest quotes at most `max_lines`
+lines and only counts the rest, and lines are read through a bounded
+queue, so memory stays flat however much the stream produces. Sends go
+through the notification dispatcher, which reuses one config and one
+HTTP connection for the whole stream.
+"""
+import queue
+import re
+import threading
+import time
+from collections.abc import Callable
+from typing import IO
+
+from tailcode.config import Config
+from tailcode.notify import notify_async
+
+# Longest line read in one go; longer lines are split.
+READ_LIMIT = 64 * 1024
+# Characters of a line quoted in a digest.
+LINE_CHARS = 300
+# Lines buffered between the reader and the matcher before the reader waits.
+QUEUE_LINES = 1000
+
+_EOF = object()
+_LEADING_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+def _group(pattern: str) -> str:
+    # Inline flags like "(?i)" are only allowed at the start of the whole
+    # regex, so scope them to this alternative instead.
+    flags = _LEADING_FLAGS.match(pattern)
+    if flags:
+        return f"(?{flags.group(1)}:{pattern[flags.end():]})"
+    return f"(?:{pattern})"
+
+
+def compile_patterns(patterns: list[str]) -> re.Pattern | None:
+    """One regex matching any of `patterns`; None (match everything) if there are none."""
+    if not patterns:
+        return None
+    return re.compile("|".join(_group(p) for p in patterns))
+
+
+class StreamNotifier:
+    """Turns matching lines into rate-limited digest notifications.
+
+    Feed lines with `feed()` and call `tick()` now and then so a digest is
+    sent once its window has passed; `follow()` does both for a file-like
+    stream. `close()` sends whatever is still pending, rate limit or not.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        patterns: list[str] | None = None,
+        title: str | None = None,
+        send: Callable[[str, str | None], object] | None = None,
+    ):
+        settings = config.notifications.stream
+        self.pattern = compile_patterns(settings.patterns if patterns is None else patterns)
+        self.title = title
+        self.window = settings.window
+        self.rate = settings.rate
+        self.burst = settings.burst
+        self.max_lines = settings.max_lines
+        self.matched = 0
+        self.sent = 0
+        self._send = send or (lambda message, title: notify_async(message, title, config))
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._lines: list[str] = []
+        self._count = 0
+        self._opened = 0.0
+
+    def feed(self, line: str) -> None:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            return
+        if self.pattern is not None and not self.pattern.search(line):
+            return
+        self.matched += 1
+        if not self._count:
+            self._opened = time.monotonic()
+        self._count += 1
+        if len(self._lines) < self.max_lines:
+            self._lines.append(line[:LINE_CHARS])
+
+    def tick(self) -> float | None:
+        """Send the digest if it's due. Returns seconds until it will be, or None."""
+        if not self._count:
+            return None
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate / 60)
+        self._refilled = now
+        due = self._opened + self.window - now
+        if due > 0:
+            return due
+        if self._tokens < 1:
+            return (1 - self._tokens) * 60 / self.rate
+        self._tokens -= 1
+        self._emit()
+        return None
+
+    def close(self) -> None:
+        if self._count:
+            self._emit()
+
+    def _emit(self) -> None:
+        if self._count == 1:
+            message = self._lines[0]
+        else:
+            message = "\n".join([f"{self._count} matching lines:", *self._lines])
+            if self._count > len(self._lines):
+                message += f"\n… and {self._count - len(self._lines)} more"
+        self._send(message, self.title)
+        self.sent += 1
+        self._lines = []
+        self._count = 0
+
+    def follow(self, stream: IO[str], echo: Callable[[str], object] | None = None) -> None:
+        """Read `stream` to EOF, feeding every line, then send what's left."""
+        lines: queue.Queue = queue.Queue(maxsize=QUEUE_LINES)
+
+        def read() -> None:
+            try:
+                while line := stream.readline(READ_LIMIT):
+                    if echo is not None:
+                        echo(line)
+                    lines.put(line)
+            finally:
+                lines.put(_EOF)
+
+        threading.Thread(target=read, name="tailcode-stdin", daemon=True).start()
+        wait = None
+        while True:
+            try:
+                line = lines.get(timeout=wait)
+            except queue.Empty:
+                wait = self.tick()
+                continue
+            if line is _EOF:
+                break
+            self.feed(line)
+            wait = self.tick()
+        self.close()
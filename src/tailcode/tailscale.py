@@ -1,12 +1,24 @@
+import json
 import subprocess
-from dataclasses import dataclass
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import asdict, dataclass, field
 
 import httpx
 
 from tailcode.config import Config
+from tailcode.jsonstream import iter_chunks, iter_members
 
 
-@dataclass
+def _projector(getters: dict[str, Callable[[dict], object]], fields: Sequence[str]) -> Callable[[dict], tuple]:
+    unknown = [f for f in fields if f not in getters]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    selected = [getters[f] for f in fields]
+    return lambda raw: tuple(get(raw) for get in selected)
+
+
+@dataclass(slots=True)
 class TailscaleDevice:
     id: str
     hostname: str
@@ -25,47 +37,140 @@ class TailscaleDevice:
     def is_mac(self) -> bool:
         return "darwin" in self.os.lower() or "macos" in self.os.lower()
 
+    @classmethod
+    def from_json(cls, d: dict) -> "TailscaleDevice":
+        return cls(
+            id=d.get("id", ""),
+            hostname=d.get("hostname", ""),
+            name=d.get("name", ""),
+            addresses=d.get("addresses", []),
+            os=d.get("os", ""),
+            online=d.get("online", False),
+            last_seen=d.get("lastSeen", ""),
+            tags=d.get("tags", []),
+        )
+
+
+# Field projections for TailscaleAPI.iter_devices, keyed by attribute name.
+DEVICE_FIELDS: dict[str, Callable[[dict], object]] = {
+    "id": lambda d: d.get("id", ""),
+    "hostname": lambda d: d.get("hostname", ""),
+    "name": lambda d: d.get("name", ""),
+    "addresses": lambda d: d.get("addresses", []),
+    "ip": lambda d: (d.get("addresses") or [None])[0],
+    "os": lambda d: d.get("os", ""),
+    "online": lambda d: d.get("online", False),
+    "last_seen": lambda d: d.get("lastSeen", ""),
+    "tags": lambda d: d.get("tags", []),
+}
+
 
 class TailscaleAPI:
-    def __init__(self, config: Config):
+    """Tailscale control-plane API client.
+
+    Holds one pooled HTTP client for its lifetime and revalidates the device
+    list with ETag/If-None-Match, so repeated lookups within a process don't
+    re-download (or re-handshake) for every call. Close it, or use it as a
+    context manager, when done.
+    """
+
+    def __init__(self, config: Config, base_url: str | None = None, max_age: float = 5.0):
         self.api_key = config.tailscale.api_key
         self.tailnet = config.tailscale.tailnet
-        self.base_url = "https://api.tailscale.com/api/v2"
+        self.base_url = base_url or "https://api.tailscale.com/api/v2"
+        self.max_age = max_age
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            auth=(self.api_key, ""),
+            timeout=30.0,
+        )
+        self._etag: str | None = None
+        self._pending_etag: str | None = None
+        self._not_modified = False
+        self._devices: list[TailscaleDevice] | None = None
+        self._by_hostname: dict[str, TailscaleDevice] = {}
+        self._fetched_at = 0.0
+
+    def __enter__(self) -> "TailscaleAPI":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._client.close()
 
     def _request(self, method: str, endpoint: str) -> dict:
-        url = f"{self.base_url}{endpoint}"
-        with httpx.Client() as client:
-            response = client.request(
-                method,
-                url,
-                auth=(self.api_key, ""),
-                timeout=30.0,
-            )
-            response.raise_for_status()
-            return response.json()
-
-    def list_devices(self) -> list[TailscaleDevice]:
-        data = self._request("GET", f"/tailnet/{self.tailnet}/devices")
-        devices = []
-        for d in data.get("devices", []):
-            devices.append(
-                TailscaleDevice(
-                    id=d.get("id", ""),
-                    hostname=d.get("hostname", ""),
-                    name=d.get("name", ""),
-                    addresses=d.get("addresses", []),
-                    os=d.get("os", ""),
-                    online=d.get("online", False),
-                    last_seen=d.get("lastSeen", ""),
-                    tags=d.get("tags", []),
-                )
-            )
+        response = self._client.request(method, endpoint)
+        response.raise_for_status()
+        return response.json()
+
+    def _iter_device_pages(self, headers: dict | None = None) -> Iterator[dict]:
+        """Stream raw device objects across all pages; yields nothing on 304 Not Modified."""
+        url = f"/tailnet/{self.tailnet}/devices"
+        first = True
+        while url:
+            with self._client.stream("GET", url, headers=headers if first else None) as response:
+                if first and response.status_code == 304:
+                    self._not_modified = True
+                    return
+                response.raise_for_status()
+                if first:
+                    self._pending_etag = response.headers.get("ETag")
+                first = False
+                for _, _, raw in iter_members(response.iter_text(), stream_keys=("devices",)):
+                    yield raw
+                # The devices endpoint isn't paginated today; follow RFC 8288
+                # next links anyway so a paged response doesn't get truncated.
+                url = response.links.get("next", {}).get("url")
+
+    def iter_devices(self, fields: Sequence[str] | None = None) -> Iterator[TailscaleDevice | tuple]:
+        """Stream devices without caching them.
+
+        With `fields`, yield plain tuples of just those attributes, e.g.
+        `iter_devices(("hostname", "online", "ip"))`.
+        """
+        project = _projector(DEVICE_FIELDS, fields) if fields else TailscaleDevice.from_json
+        for raw in self._iter_device_pages():
+            yield project(raw)
+
+    def _fetch_devices(self) -> list[TailscaleDevice] | None:
+        """Fetch the full device list, or None if it hasn't changed since the last fetch."""
+        headers = {"If-None-Match": self._etag} if self._etag and self._devices is not None else {}
+        self._pending_etag = None
+        self._not_modified = False
+        devices = [TailscaleDevice.from_json(raw) for raw in self._iter_device_pages(headers)]
+        if self._not_modified:
+            return None
+        self._etag = self._pending_etag
+        return devices
+
+    def list_devices(self, refresh: bool = False) -> list[TailscaleDevice]:
+        if (
+            not refresh
+            and self._devices is not None
+            and time.monotonic() - self._fetched_at < self.max_age
+        ):
+            return self._devices
+
+        devices = self._fetch_devices()
+        self._fetched_at = time.monotonic()
+        if devices is None:
+            return self._devices
+
+        self._devices = devices
+        self._by_hostname = {}
+        for device in devices:
+            self._by_hostname.setdefault(device.hostname, device)
         return devices
 
     def find_device(self, hostname: str) -> TailscaleDevice | None:
         devices = self.list_devices()
+        device = self._by_hostname.get(hostname)
+        if device:
+            return device
         for device in devices:
-            if device.hostname == hostname or device.name.startswith(hostname):
+            if device.name.startswith(hostname):
                 return device
         return None
 
@@ -74,6 +179,11 @@ class TailscaleAPI:
 
 
 def get_local_tailscale_ip() -> str | None:
+    from tailcode.localapi import get_localapi
+
+    ip = get_localapi().local_ip()
+    if ip:
+        return ip
     try:
         result = subprocess.run(
             ["tailscale", "ip", "-4"],
@@ -89,6 +199,11 @@ def get_local_tailscale_ip() -> str | None:
 
 
 def get_tailscale_status() -> dict | None:
+    from tailcode.localapi import get_localapi
+
+    status = get_localapi().status()
+    if status:
+        return status
     try:
         result = subprocess.run(
             ["tailscale", "status", "--json"],
@@ -97,21 +212,174 @@ def get_tailscale_status() -> dict | None:
             timeout=5,
         )
         if result.returncode == 0:
-            import json
             return json.loads(result.stdout)
-    except (subprocess.TimeoutExpired, FileNotFoundError):
+    except (subprocess.TimeoutExpired, FileNotFoundError, json.JSONDecodeError):
         pass
     return None
 
 
-def is_peer_online(hostname: str) -> bool:
-    status = get_tailscale_status()
-    if not status:
-        return False
-    
-    peers = status.get("Peer", {})
-    for peer_info in peers.values():
-        peer_hostname = peer_info.get("HostName", "")
-        if hostname in peer_hostname or peer_hostname in hostname:
-            return peer_info.get("Online", False)
-    return False
+@dataclass(slots=True)
+class PeerStatus:
+    hostname: str
+    dns_name: str
+    online: bool
+    ips: list[str] = field(default_factory=list)
+    os: str = ""
+
+    @classmethod
+    def from_json(cls, data: dict) -> "PeerStatus":
+        return cls(
+            hostname=data.get("HostName", ""),
+            dns_name=data.get("DNSName", "").split(".")[0],
+            online=data.get("Online", False),
+            ips=data.get("TailscaleIPs") or [],
+            os=data.get("OS", ""),
+        )
+
+
+# Field projections for iter_status_peers, keyed by PeerStatus attribute name.
+PEER_FIELDS: dict[str, Callable[[dict], object]] = {
+    "hostname": lambda d: d.get("HostName", ""),
+    "dns_name": lambda d: d.get("DNSName", "").split(".")[0],
+    "online": lambda d: d.get("Online", False),
+    "ips": lambda d: d.get("TailscaleIPs") or [],
+    "ip": lambda d: (d.get("TailscaleIPs") or [None])[0],
+    "os": lambda d: d.get("OS", ""),
+}
+
+_STATUS_ERRORS = (httpx.HTTPError, subprocess.SubprocessError, OSError, ValueError)
+
+
+def _cli_status_text() -> Iterable[str]:
+    result = subprocess.run(
+        ["tailscale", "status", "--json"],
+        capture_output=True,
+        text=True,
+        timeout=5,
+    )
+    result.check_returncode()
+    return iter_chunks(result.stdout)
+
+
+def _status_sources() -> Iterator[Callable[[], Iterable[str]]]:
+    from tailcode.localapi import get_localapi
+
+    api = get_localapi()
+    if api.available:
+        yield api.iter_status_text
+    yield _cli_status_text
+
+
+def iter_status_peers(fields: Sequence[str] | None = None) -> Iterator[PeerStatus | tuple]:
+    """Stream peers from tailscale status without building the whole document.
+
+    With `fields`, yield plain tuples of just those values, e.g.
+    `iter_status_peers(("hostname", "online", "ip"))`.
+    """
+    project = _projector(PEER_FIELDS, fields) if fields else PeerStatus.from_json
+    for source in _status_sources():
+        yielded = False
+        try:
+            for _, _, raw in iter_members(source(), stream_keys=("Peer",)):
+                yielded = True
+                yield project(raw)
+            return
+        except _STATUS_ERRORS:
+            if yielded:
+                raise
+
+
+class TailscaleStatus:
+    """One `tailscale status` result, indexed for repeated peer lookups.
+
+    Take a snapshot once per command and pass it around instead of calling
+    `is_peer_online` per device, which re-runs the tailscale CLI every time.
+    """
+
+    def __init__(
+        self,
+        peers: list[PeerStatus],
+        self_peer: PeerStatus | None = None,
+        fetched_at: float | None = None,
+    ):
+        self.peers = peers
+        self.self_peer = self_peer
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self._index: dict[str, PeerStatus | None] = {}
+        for peer in peers:
+            for key in (peer.hostname.lower(), peer.dns_name.lower()):
+                if key:
+                    self._index.setdefault(key, peer)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "TailscaleStatus":
+        peers = [PeerStatus.from_json(p) for p in (data.get("Peer") or {}).values()]
+        self_data = data.get("Self")
+        self_peer = PeerStatus.from_json(self_data) if self_data else None
+        return cls(peers, self_peer=self_peer)
+
+    @classmethod
+    def from_stream(cls, chunks: Iterable[str]) -> "TailscaleStatus":
+        peers = []
+        self_peer = None
+        for key, _, raw in iter_members(chunks, stream_keys=("Peer",), keep=("Self",)):
+            if key == "Peer":
+                peers.append(PeerStatus.from_json(raw))
+            elif raw:
+                self_peer = PeerStatus.from_json(raw)
+        return cls(peers, self_peer=self_peer)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TailscaleStatus":
+        peers = [PeerStatus(**p) for p in data.get("peers", [])]
+        self_data = data.get("self")
+        self_peer = PeerStatus(**self_data) if self_data else None
+        return cls(peers, self_peer=self_peer, fetched_at=data.get("fetched_at", 0.0))
+
+    def to_dict(self) -> dict:
+        return {
+            "fetched_at": self.fetched_at,
+            "self": asdict(self.self_peer) if self.self_peer else None,
+            "peers": [asdict(p) for p in self.peers],
+        }
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.peers) or self.self_peer is not None
+
+    def find_peer(self, hostname: str) -> PeerStatus | None:
+        key = hostname.lower()
+        if key in self._index:
+            return self._index[key]
+        # Fall back to the loose substring match is_peer_online always used,
+        # and remember the answer (including misses) for the next lookup.
+        found = None
+        for peer in self.peers:
+            if peer.hostname and (hostname in peer.hostname or peer.hostname in hostname):
+                found = peer
+                break
+        self._index[key] = found
+        return found
+
+    def is_online(self, hostname: str) -> bool:
+        peer = self.find_peer(hostname)
+        return peer.online if peer else False
+
+
+def get_status_snapshot() -> TailscaleStatus:
+    for source in _status_sources():
+        try:
+            return TailscaleStatus.from_stream(source())
+        except _STATUS_ERRORS:
+            continue
+    return TailscaleStatus([])
+
+
+def is_peer_online(hostname: str, snapshot: TailscaleStatus | None = None) -> bool:
+    if snapshot is None:
+        snapshot = get_status_snapshot()
+    return snapshot.is_online(hostname)
@@ -0,0 +1,201 @@
+"""Local SQLite store of wake, connect and probe events.
+
+`record()` only puts the event on a queue; a background thread writes
+batches, so callers on the wake/connect path never wait on disk. Set
+TAILCODE_TELEMETRY=0 to turn recording off.
+"""
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from tailcode.cache import get_cache_dir
+
+TELEMETRY_FILE = "telemetry.db"
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 0.5
+MAX_QUEUE = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    device TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    method TEXT,
+    relay TEXT,
+    ok INTEGER,
+    duration REAL,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS events_kind_device_ts ON events (kind, device, ts);
+"""
+
+COLUMNS = ("ts", "kind", "device", "source", "method", "relay", "ok", "duration", "detail")
+_INSERT = f"INSERT INTO events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+class TelemetryStore:
+    def __init__(self, path: Path, source: str = "cli"):
+        self.path = path
+        self.source = source
+        self._queue: queue.Queue[tuple | threading.Event] = queue.Queue(MAX_QUEUE)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._write_loop, name="tailcode-telemetry", daemon=True
+                )
+                self._thread.start()
+
+    def record(
+        self,
+        kind: str,
+        device: str = "",
+        ok: bool | None = None,
+        duration: float | None = None,
+        method: str | None = None,
+        relay: str | None = None,
+        detail: str | None = None,
+    ) -> None:
+        row = (
+            time.time(),
+            kind,
+            device,
+            self.source,
+            method,
+            relay,
+            None if ok is None else int(ok),
+            duration,
+            detail,
+        )
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            pass
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """Wait (up to `timeout`) for everything recorded so far to be written."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        self.flush()
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.executescript(SCHEMA)
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def _write_loop(self) -> None:
+        conn = sqlite3.connect(self.path)
+        conn.executescript(SCHEMA)
+        while True:
+            rows: list[tuple] = []
+            waiters: list[threading.Event] = []
+            item = self._queue.get()
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    rows.append(item)
+                if len(rows) >= BATCH_SIZE or waiters:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if rows:
+                try:
+                    with conn:
+                        conn.executemany(_INSERT, rows)
+                except sqlite3.Error:
+                    pass
+            for waiter in waiters:
+                waiter.set()
+
+
+_store: TelemetryStore | None = None
+
+
+def enabled() -> bool:
+    return os.environ.get("TAILCODE_TELEMETRY", "1") not in ("0", "false", "no")
+
+
+def get_store() -> TelemetryStore:
+    global _store
+    if _store is None:
+        _store = TelemetryStore(get_cache_dir() / TELEMETRY_FILE)
+        atexit.register(_store.flush, 1.0)
+    return _store
+
+
+def set_source(source: str) -> None:
+    """Tag events from this process, e.g. "webhook" for `tc serve`."""
+    get_store().source = source
+
+
+def record(kind: str, device: str = "", **fields) -> None:
+    if enabled():
+        get_store().record(kind, device, **fields)
+
+
+def _latency(samples: list[float]) -> dict | None:
+    from tailcode.boottime import percentile
+
+    if not samples:
+        return None
+    return {
+        "count": len(samples),
+        "p50": round(percentile(samples, 50), 3),
+        "p95": round(percentile(samples, 95), 3),
+    }
+
+
+def summarize(since: float) -> dict:
+    """Per-device latency percentiles and per-relay success rates since `since`."""
+    store = get_store()
+    rows = store.query(
+        "SELECT kind, device, duration FROM events"
+        " WHERE ts >= ? AND ok = 1 AND duration IS NOT NULL"
+        " AND kind IN ('wake', 'ready', 'connect')"
+        " AND NOT (kind = 'ready' AND COALESCE(detail, '') = 'no wake')",
+        (since,),
+    )
+    samples: dict[str, dict[str, list[float]]] = {}
+    for kind, device, duration in rows:
+        samples.setdefault(device, {}).setdefault(kind, []).append(duration)
+
+    relays = store.query(
+        "SELECT relay, COUNT(*), SUM(ok) FROM events"
+        " WHERE ts >= ? AND kind = 'wake' AND relay IS NOT NULL GROUP BY relay ORDER BY relay",
+        (since,),
+    )
+    return {
+        "devices": {
+            device: {kind: _latency(kinds.get(kind, [])) for kind in ("wake", "ready", "connect")}
+            for device, kinds in sorted(samples.items())
+        },
+        "relays": {
+            relay: {"attempts": total, "succeeded": ok or 0, "rate": round((ok or 0) / total, 3)}
+            for relay, total, ok in relays
+        },
+    }
@@ -0,0 +1,98 @@
+"""Span timeline of the wake-to-ready path, for `--timing`.
+
+Nothing is recorded unless a timeline was started; `span()` then returns a
+shared no-op context manager.
+"""
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+
+_NULL = nullcontext()
+_current: "Timeline | None" = None
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    depth: int
+    end: float | None = None
+    detail: str = ""
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.monotonic()) - self.start
+
+
+class Timeline:
+    def __init__(self):
+        self.origin = time.monotonic()
+        self.spans: list[Span] = []
+        self._open: list[Span] = []
+
+    def begin(self, name: str, detail: str = "") -> Span:
+        span = Span(name, time.monotonic(), len(self._open), detail=detail)
+        self.spans.append(span)
+        self._open.append(span)
+        return span
+
+    def end(self, span: Span, detail: str | None = None) -> None:
+        span.end = time.monotonic()
+        if detail is not None:
+            span.detail = detail
+        if span in self._open:
+            self._open.remove(span)
+
+    @contextmanager
+    def span(self, name: str, detail: str = ""):
+        span = self.begin(name, detail)
+        try:
+            yield span
+        finally:
+            self.end(span)
+
+    @property
+    def total(self) -> float:
+        return time.monotonic() - self.origin
+
+    def to_dict(self) -> dict:
+        return {
+            "total": round(self.total, 3),
+            "spans": [
+                {
+                    "name": s.name,
+                    "depth": s.depth,
+                    "start": round(s.start - self.origin, 3),
+                    "duration": round(s.duration, 3),
+                    "detail": s.detail,
+                }
+                for s in self.spans
+            ],
+        }
+
+
+def start() -> Timeline:
+    global _current
+    _current = Timeline()
+    return _current
+
+
+def stop() -> "Timeline | None":
+    global _current
+    timeline, _current = _current, None
+    return timeline
+
+
+def span(name: str, detail: str = ""):
+    if _current is None:
+        return _NULL
+    return _current.span(name, detail)
+
+
+def begin(name: str, detail: str = "") -> Span | None:
+    return _current.begin(name, detail) if _current is not None else None
+
+
+def end(span: Span | None, detail: str | None = None) -> None:
+    if span is not None and _current is not None:
+        _current.end(span, detail)
@@ -1,18 +1,248 @@
 import json
 import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
 from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from threading import BoundedSemaphore
 
-from tailcode.config import load_config
-from tailcode.notify import notify
-from tailcode.ssh import is_reachable
-from tailcode.tailscale import is_peer_online
+from tailcode import metrics, telemetry
+from tailcode.config import Config, Device, find_config_path
+from tailcode.configwatch import ConfigWatcher
+from tailcode.jobs import JobTable
+from tailcode.notify import deliver, get_dispatcher, notify_async
+from tailcode.presence import PresenceMonitor
+from tailcode.probe import probe
+from tailcode.readiness import ReadinessRegistry
+from tailcode.singleflight import SingleFlight
+from tailcode.tailscale import get_status_snapshot
 from tailcode.wol import find_wake_relay, wake_device
 
-CONFIG = load_config()
 AUTH_TOKEN = os.environ.get("TAILCODE_TOKEN", "")
 
+DEFAULT_WORKERS = 8
+# Wakes and notifications in flight at once, including async jobs and /ready wakes.
+DEFAULT_ACTION_WORKERS = 8
+# /status gets a pool of its own so a backlog of slow wakes can't starve it.
+STATUS_WORKERS = 2
+DEFAULT_REQUEST_TIMEOUT = 20.0
+# How long an idle keep-alive connection may hold a worker.
+KEEPALIVE_TIMEOUT = 5.0
+# Upper bound on how long POST /ready may hold a request open.
+MAX_READY_WAIT = 120.0
+PRESENCE_INTERVAL = 5.0
+# Comment line sent on an idle /events stream so proxies keep it open.
+SSE_KEEPALIVE = 15.0
+# Simulated relay hop / push latency for the --dry-run stand-ins.
+DRY_RUN_LATENCY = 0.05
+# How often the config file is checked for changes.
+CONFIG_CHECK_INTERVAL = 2.0
+# Route label for /metrics; anything else is counted as "other".
+ROUTES = ("/health", "/events", "/metrics", "/wake", "/ready", "/status", "/notify", "/discover")
+
+
+def _no_phase(phase: str) -> None:
+    pass
+
+
+# Repeat or concurrent wakes for one device share a single relay hop and
+# notification; a success is reused for the cooldown.
+# The cooldown follows preferences.wake_cooldown of the loaded config.
+WAKES = SingleFlight(cooldown=Config().preferences.wake_cooldown, keep=lambda r: r["ok"])
+
+
+def wake_action(device: Device, config: Config, on_phase=_no_phase) -> dict:
+    def run() -> dict:
+        on_phase("finding_relay")
+        relay = find_wake_relay(device, config, snapshot=get_status_snapshot())
+        on_phase("waking")
+        result = wake_device(device, config, relay=relay)
+        if result["success"]:
+            on_phase("notifying")
+            notify_async(f"Waking {device.name}", config=config)
+        return {"ok": result["success"], "method": result.get("method")}
+
+    result, shared = WAKES.do(device.name, run)
+    outcome = "coalesced" if shared else ("ok" if result["ok"] else "failed")
+    metrics.WAKES.inc(result["method"] or "none", outcome)
+    telemetry.record(
+        "wake_request",
+        device.name,
+        ok=result["ok"],
+        method=result["method"],
+        detail="coalesced" if shared else None,
+    )
+    return {**result, "coalesced": shared}
+
+
+def notify_action(message: str, title: str, config: Config, on_phase=_no_phase) -> dict:
+    on_phase("sending")
+    return deliver(message, title=title, config=config).to_dict()
+
+
+def dry_wake_action(device: Device, config: Config, on_phase=_no_phase) -> dict:
+    """wake_action without the WoL packet or notification, for load testing."""
+    def run() -> dict:
+        on_phase("waking")
+        time.sleep(DRY_RUN_LATENCY)
+        return {"ok": True, "method": "dry-run"}
+
+    result, shared = WAKES.do(device.name, run)
+    return {**result, "coalesced": shared}
+
+
+def dry_notify_action(message: str, title: str, config: Config, on_phase=_no_phase) -> dict:
+    on_phase("sending")
+    time.sleep(DRY_RUN_LATENCY)
+    return {"ok": True, "dry_run": True}
+
+
+def status_action(
+    config: Config, presence: PresenceMonitor | None = None, on_phase=_no_phase
+) -> dict:
+    snapshot = None
+    if presence is not None:
+        presence.touch()
+        snapshot = presence.snapshot(max_age=2 * presence.interval)
+    if snapshot is None:
+        snapshot = get_status_snapshot()
+    devices = []
+    for name, device in config.devices.items():
+        online = snapshot.is_online(device.hostname)
+        devices.append({
+            "name": name,
+            "hostname": device.hostname,
+            "online": online,
+            "role": device.role,
+        })
+    return {"devices": devices}
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that serves connections on a bounded pool of worker threads.
+
+    Slow actions (relay wakes, notifications) run on a separate action pool
+    of `action_workers`, and /status on a small pool of its own. Both are
+    cut off after `request_timeout`, so they can't tie up the workers
+    answering /health and friends, and queued wakes can't hold up /status.
+
+    With `dry_run`, /wake and /notify go to stand-ins that only sleep, so
+    the server can be load tested without waking or pinging anyone.
+
+    The config file is watched and reloaded in the background. Handlers
+    read `self.config` once per request, so a request that started before
+    a reload finishes against the config it started with.
+    """
+
+    def __init__(
+        self,
+        server_address,
+        handler_class,
+        workers: int = DEFAULT_WORKERS,
+        request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        dry_run: bool = False,
+        config_path: Path | None = None,
+        action_workers: int = DEFAULT_ACTION_WORKERS,
+    ):
+        super().__init__(server_address, handler_class)
+        self.dry_run = dry_run
+        self.watcher = ConfigWatcher(
+            config_path or find_config_path(),
+            interval=CONFIG_CHECK_INTERVAL,
+            on_reload=self._apply_config,
+        )
+        self._apply_config(self.watcher.config)
+        self.watcher.start()
+        self.request_timeout = request_timeout
+        self.wake_action = dry_wake_action if dry_run else wake_action
+        self.notify_action = dry_notify_action if dry_run else notify_action
+        self.workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tailcode-http")
+        self.actions = ThreadPoolExecutor(
+            max_workers=action_workers, thread_name_prefix="tailcode-action"
+        )
+        self.status_pool = ThreadPoolExecutor(
+            max_workers=STATUS_WORKERS, thread_name_prefix="tailcode-status"
+        )
+        self.jobs = JobTable(self.actions)
+        self.readiness = ReadinessRegistry(lambda device: probe(device, self.config).ok)
+        self.presence = PresenceMonitor(lambda: self.config, interval=PRESENCE_INTERVAL)
+        self.presence.start()
+        # Long-polls and event streams hold a worker each; keep at least half
+        # the pool free for everyone else.
+        self.long_polls = BoundedSemaphore(max(1, workers // 2))
+        # Connections queued beyond this are turned away rather than piling up.
+        self._slots = BoundedSemaphore(workers * 4)
+
+    @property
+    def config(self) -> Config:
+        return self.watcher.config
+
+    def _apply_config(self, config: Config) -> None:
+        WAKES.cooldown = config.preferences.wake_cooldown
+        if not self.dry_run:
+            # Also delivers anything a previous run left in the outbox.
+            get_dispatcher().start(config)
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            metrics.HTTP_REJECTED.inc()
+            try:
+                request.sendall(
+                    b"HTTP/1.1 503 Service Unavailable\r\n"
+                    b"Content-Length: 0\r\nConnection: close\r\n\r\n"
+                )
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self.workers.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.workers.shutdown(wait=False, cancel_futures=True)
+        self.actions.shutdown(wait=False, cancel_futures=True)
+        self.status_pool.shutdown(wait=False, cancel_futures=True)
+
 
 class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+    # Headers and body go out as separate writes; without this, keep-alive
+    # requests stall on Nagle + delayed ACK.
+    disable_nagle_algorithm = True
+    _status = 0
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def _route(self) -> str:
+        path = self.path.split("?", 1)[0]
+        if path in ROUTES:
+            return path
+        return "/jobs" if path.startswith("/jobs/") else "other"
+
+    def _timed(self, handle) -> None:
+        self._status = 0
+        start = time.monotonic()
+        try:
+            handle()
+        finally:
+            route = self._route()
+            metrics.HTTP_DURATION.observe(route, value=time.monotonic() - start)
+            metrics.HTTP_REQUESTS.inc(route, self.command, str(self._status or "aborted"))
+
     def _auth(self) -> bool:
         if not AUTH_TOKEN:
             return True
@@ -20,57 +250,204 @@ class Handler(BaseHTTPRequestHandler):
         return token == AUTH_TOKEN
 
     def _json(self, data: dict, status: int = 200):
+        body = json.dumps(data).encode()
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _run_action(self, action: str, fn, *args, run_async: bool = False, executor=None):
+        """Reply with `fn`'s result, or 504 on timeout.
+
+        With `run_async`, queue it as a job instead and reply 202 with its id.
+        Runs on the action pool unless another `executor` is given.
+        """
+        executor = executor or self.server.actions
+        if run_async:
+            job = self.server.jobs.submit(action, fn, *args, executor=executor)
+            if job is None:
+                self._json({"ok": False, "error": "too many pending jobs"}, 503)
+                return
+            self._json({"ok": True, "job": job.id, "url": f"/jobs/{job.id}"}, 202)
+            return
+
+        future = executor.submit(fn, *args)
+        try:
+            self._json(future.result(timeout=self.server.request_timeout))
+        except FutureTimeout:
+            self._json({"ok": False, "error": "timeout"}, 504)
+
+    def _wait_ready(self, device: Device, config: Config, timeout: float, wake: bool):
+        """Wake `device` if it's offline and hold the request until it's reachable."""
+        if not self.server.long_polls.acquire(blocking=False):
+            self._json({"ok": False, "error": "too many waiting requests"}, 503)
+            return
+        try:
+            start = time.monotonic()
+            wake_future = None
+            if wake and device.can_wake and not get_status_snapshot().is_online(device.hostname):
+                wake_future = self.server.actions.submit(self.server.wake_action, device, config)
+            ready = self.server.readiness.wait(device, timeout)
+            waited = time.monotonic() - start
+            wake_result = None
+            if wake_future is not None:
+                wake_result = wake_future.result() if wake_future.done() else {"pending": True}
+            # Waits without a wake are kept out of the wake-to-ready stats.
+            detail = None if wake_future is not None else "no wake"
+            telemetry.record("ready", device.name, ok=ready, duration=waited, detail=detail)
+            self._json({
+                "ok": ready,
+                "ready": ready,
+                "waited": round(waited, 1),
+                "wake": wake_result,
+            })
+        finally:
+            self.server.long_polls.release()
+
+    def _stream_events(self):
+        """Serve presence changes as Server-Sent Events until the client leaves."""
+        if not self.server.long_polls.acquire(blocking=False):
+            self._json({"ok": False, "error": "too many open streams"}, 503)
+            return
+        sub = self.server.presence.subscribe()
+        try:
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            while True:
+                try:
+                    item = sub.get(timeout=SSE_KEEPALIVE)
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                    continue
+                if item is None:
+                    return
+                event, data = item
+                self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+        except OSError:
+            pass
+        finally:
+            self.server.presence.unsubscribe(sub)
+            self.server.long_polls.release()
+
+    def _metrics(self):
+        body = metrics.REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
 
     def do_GET(self):
+        self._timed(self._handle_get)
+
+    def do_POST(self):
+        self._timed(self._handle_post)
+
+    def _handle_get(self):
         if self.path == "/health":
-            self._json({"ok": True})
+            health = {"ok": True}
+            if self.server.dry_run:
+                health["dry_run"] = True
+            if self.server.watcher.last_error:
+                health["config_error"] = self.server.watcher.last_error
+            self._json(health)
+            return
+
+        if self.path == "/events":
+            if not self._auth():
+                self._json({"error": "unauthorized"}, 401)
+                return
+            self._stream_events()
+            return
+
+        if self.path == "/metrics":
+            if not self._auth():
+                self._json({"error": "unauthorized"}, 401)
+                return
+            self._metrics()
+            return
+
+        if self.path.startswith("/jobs/"):
+            if not self._auth():
+                self._json({"error": "unauthorized"}, 401)
+                return
+            job = self.server.jobs.get(self.path.removeprefix("/jobs/"))
+            if not job:
+                self._json({"error": "unknown job"}, 404)
+                return
+            self._json(job.to_dict())
             return
+
         self._json({"error": "not found"}, 404)
 
-    def do_POST(self):
+    def _handle_post(self):
+        # Always drain the body first so a rejected request doesn't leave bytes
+        # behind on a keep-alive connection.
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode() if length else "{}"
+
         if not self._auth():
             self._json({"error": "unauthorized"}, 401)
             return
 
-        length = int(self.headers.get("Content-Length", 0))
-        body = self.rfile.read(length).decode() if length else "{}"
         try:
             data = json.loads(body) if body else {}
         except json.JSONDecodeError:
+            data = None
+        if not isinstance(data, dict):
             self._json({"error": "invalid json"}, 400)
             return
+        run_async = bool(data.get("async"))
+        # One config for the whole request, even if a reload lands meanwhile.
+        config = self.server.config
 
         if self.path == "/wake":
             name = data.get("device")
             if not name:
                 self._json({"error": "device required"}, 400)
                 return
-            device = CONFIG.get_device(name)
+            device = config.get_device(name)
             if not device:
                 self._json({"error": f"unknown device: {name}"}, 404)
                 return
-            relay = find_wake_relay(device, CONFIG)
-            result = wake_device(device, CONFIG, relay=relay)
-            if result["success"]:
-                notify(f"Waking {name}", config=CONFIG)
-            self._json({"ok": result["success"], "method": result.get("method")})
+            self._run_action("wake", self.server.wake_action, device, config, run_async=run_async)
+            return
+
+        if self.path == "/ready":
+            name = data.get("device")
+            if not name:
+                self._json({"error": "device required"}, 400)
+                return
+            device = config.get_device(name)
+            if not device:
+                self._json({"error": f"unknown device: {name}"}, 404)
+                return
+            try:
+                timeout = min(float(data.get("timeout", 60)), MAX_READY_WAIT)
+            except (TypeError, ValueError):
+                self._json({"error": "invalid timeout"}, 400)
+                return
+            wake = data.get("wake", True)
+            if not isinstance(wake, bool):
+                self._json({"error": "wake must be true or false"}, 400)
+                return
+            self._wait_ready(device, config, timeout, wake=wake)
             return
 
         if self.path == "/status":
-            devices = []
-            for name, device in CONFIG.devices.items():
-                online = is_peer_online(device.hostname)
-                devices.append({
-                    "name": name,
-                    "hostname": device.hostname,
-                    "online": online,
-                    "role": device.role,
-                })
-            self._json({"devices": devices})
+            self._run_action(
+                "status",
+                status_action,
+                config,
+                self.server.presence,
+                run_async=run_async,
+                executor=self.server.status_pool,
+            )
             return
 
         if self.path == "/notify":
@@ -78,8 +455,10 @@ class Handler(BaseHTTPRequestHandler):
             if not msg:
                 self._json({"error": "message required"}, 400)
                 return
-            ok = notify(msg, title=data.get("title", "Tailcode"), config=CONFIG)
-            self._json({"ok": ok})
+            title = data.get("title", "Tailcode")
+            self._run_action(
+                "notify", self.server.notify_action, msg, title, config, run_async=run_async
+            )
             return
 
         if self.path == "/discover":
@@ -98,6 +477,36 @@ class Handler(BaseHTTPRequestHandler):
         pass
 
 
-def run_server(host: str = "0.0.0.0", port: int = 8765):
-    server = HTTPServer((host, port), Handler)
-    server.serve_forever()
+def create_server(
+    host: str = "0.0.0.0",
+    port: int = 8765,
+    workers: int = DEFAULT_WORKERS,
+    request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    dry_run: bool = False,
+    action_workers: int = DEFAULT_ACTION_WORKERS,
+) -> PooledHTTPServer:
+    return PooledHTTPServer(
+        (host, port),
+        Handler,
+        workers=workers,
+        request_timeout=request_timeout,
+        dry_run=dry_run,
+        action_workers=action_workers,
+    )
+
+
+def run_server(
+    host: str = "0.0.0.0",
+    port: int = 8765,
+    workers: int = DEFAULT_WORKERS,
+    request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    dry_run: bool = False,
+    action_workers: int = DEFAULT_ACTION_WORKERS,
+):
+    telemetry.set_source("webhook")
+    metrics.observe_subprocesses()
+    server = create_server(host, port, workers, request_timeout, dry_run, action_workers)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -1,9 +1,14 @@
 import socket
 import struct
 import subprocess
+import time
+from typing import TYPE_CHECKING
 
 from tailcode.config import Config, Device
 
+if TYPE_CHECKING:
+    from tailcode.tailscale import TailscaleStatus
+
 
 def create_magic_packet(mac: str) -> bytes:
     mac_clean = mac.replace(":", "").replace("-", "").replace(".", "")
@@ -24,13 +29,17 @@ def send_wol_packet(mac: str, broadcast: str = "255.255.255.255", port: int = 9)
         return False
 
 
+def _wol_command(mac: str) -> str:
+    return f"python3 -c \"import socket; s=socket.socket(socket.AF_INET,socket.SOCK_DGRAM); s.setsockopt(socket.SOL_SOCKET,socket.SO_BROADCAST,1); s.sendto(b'\\\\xff'*6+bytes.fromhex('{mac.replace(':','')}')*16,('255.255.255.255',9)); print('sent')\""
+
+
 def send_wol_via_ssh(
     mac: str,
     relay_host: str,
     relay_user: str,
     use_tailscale_ssh: bool = True,
 ) -> dict:
-    wol_cmd = f"python3 -c \"import socket; s=socket.socket(socket.AF_INET,socket.SOCK_DGRAM); s.setsockopt(socket.SOL_SOCKET,socket.SO_BROADCAST,1); s.sendto(b'\\\\xff'*6+bytes.fromhex('{mac.replace(':','')}')*16,('255.255.255.255',9)); print('sent')\""
+    wol_cmd = _wol_command(mac)
     
     if use_tailscale_ssh:
         cmd = ["tailscale", "ssh", f"{relay_user}@{relay_host}", wol_cmd]
@@ -50,39 +59,73 @@ def send_wol_via_ssh(
         return {"success": False, "error": str(e)}
 
 
+def send_wol_via_relay(mac: str, relay: Device, config: Config) -> dict:
+    """Like send_wol_via_ssh, but over the relay's shared SSH connection."""
+    from tailcode.ssh import ssh_exec
+
+    try:
+        result = ssh_exec(relay, config, _wol_command(mac), timeout=30)
+        return {
+            "success": result.returncode == 0,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+        }
+    except subprocess.TimeoutExpired:
+        return {"success": False, "error": "timeout"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
 def wake_device(device: Device, config: Config, relay: Device | None = None) -> dict:
+    from tailcode import telemetry, timeline
+
     if not device.mac:
         return {"success": False, "error": "No MAC address configured", "method": None}
 
+    start = time.monotonic()
     if relay:
-        result = send_wol_via_ssh(
-            mac=device.mac,
-            relay_host=relay.hostname,
-            relay_user=relay.user,
-            use_tailscale_ssh=config.ssh.use_tailscale_ssh,
-        )
+        with timeline.span("relay_hop", relay.name):
+            result = send_wol_via_relay(device.mac, relay, config)
         result["method"] = f"relay:{relay.name}"
-        return result
+    else:
+        with timeline.span("broadcast"):
+            success = send_wol_packet(device.mac)
+        result = {
+            "success": success,
+            "method": "local" if success else None,
+            "error": None if success else "Failed to send WoL packet",
+        }
+
+    telemetry.record(
+        "wake",
+        device.name,
+        ok=result["success"],
+        duration=time.monotonic() - start,
+        method="relay" if relay else "local",
+        relay=relay.name if relay else None,
+        detail=result.get("error"),
+    )
+    return result
 
-    success = send_wol_packet(device.mac)
-    return {
-        "success": success,
-        "method": "local" if success else None,
-        "error": None if success else "Failed to send WoL packet",
-    }
 
+def find_wake_relay(
+    target: Device,
+    config: Config,
+    snapshot: "TailscaleStatus | None" = None,
+) -> Device | None:
+    from tailcode.tailscale import get_status_snapshot
 
-def find_wake_relay(target: Device, config: Config) -> Device | None:
-    from tailcode.tailscale import is_peer_online
+    if snapshot is None:
+        snapshot = get_status_snapshot()
     
     configured_relay = config.get_wake_relay_for_location(target.location)
-    if configured_relay and configured_relay.name != target.name and is_peer_online(configured_relay.hostname):
+    if configured_relay and configured_relay.name != target.name and snapshot.is_online(configured_relay.hostname):
         return configured_relay
     
     for device in config.get_servers():
         if device.name == target.name:
             continue
-        if device.location == target.location and is_peer_online(device.hostname):
+        if device.location == target.location and snapshot.is_online(device.hostname):
             return device
     
     return None
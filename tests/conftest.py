@@ -0,0 +1,51 @@
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+import tailcode
+
+from fakes import FakeFleet
+
+
+@pytest.fixture
+def fleet(tmp_path, monkeypatch):
+    """A small fake fleet whose tailscale/ssh fakes and home are on this process's env."""
+    fleet = FakeFleet(tmp_path, size=4).write()
+    # Subprocesses such as fleet.tc() import tailcode from this checkout too.
+    src = str(Path(tailcode.__file__).parents[1])
+    pythonpath = os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")]))
+    for key, value in fleet.env(TAILCODE_TELEMETRY="0", PYTHONPATH=pythonpath).items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.chdir(fleet.root)
+    return fleet
+
+
+@pytest.fixture
+def make_webhook(fleet):
+    """Start dry-run webhook servers on ephemeral ports; all are stopped afterwards."""
+    from tailcode.webhook import Handler, PooledHTTPServer
+
+    servers = []
+
+    def make(**options) -> PooledHTTPServer:
+        options.setdefault("workers", 4)
+        server = PooledHTTPServer(
+            ("127.0.0.1", 0), Handler, dry_run=True, config_path=fleet.root / "config.yaml", **options
+        )
+        server.url = f"http://127.0.0.1:{server.server_address[1]}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def webhook(make_webhook):
+    """Base URL of a dry-run webhook server."""
+    return make_webhook().url
@@ -0,0 +1,51 @@
+import pytest
+import typer
+
+from tailcode import boottime, cli, probe
+from tailcode.boottime import BootModel, load_boot_times, load_timeouts
+from tailcode.config import Device
+from tailcode.probe import ProbeResult, ProbeStage
+
+
+def test_timeouts_are_kept_out_of_the_samples(fleet):
+    for seconds in (20, 22, 25):
+        boottime.record_boot_time("box", seconds)
+    boottime.record_timeout("box", boottime.MAX_TIMEOUT)
+
+    assert load_boot_times("box") == [20, 22, 25]
+    model = BootModel.for_device("box")
+    assert model.timeout() == boottime.MAX_TIMEOUT
+    # Probe spacing still follows the real boots.
+    assert model.next_delay(23) == boottime.DENSE_DELAY
+
+
+def test_a_successful_wake_forgets_earlier_timeouts(fleet):
+    boottime.record_timeout("box", 60)
+    assert BootModel.for_device("box").timeout() == 60 + boottime.EXTEND_TIMEOUT
+
+    boottime.record_boot_time("box", 20)
+    assert load_timeouts("box") == []
+    assert BootModel.for_device("box").timeout() == boottime.DEFAULT_TIMEOUT
+
+
+def _stuck_at(reached: str):
+    stages = [ProbeStage(name, True, 0.0) for name in probe.STAGES]
+    stages = stages[: probe.STAGES.index(reached) + 1]
+    stages.append(ProbeStage("next", False, 0.0))
+    return lambda device, config: ProbeResult(device.name, stages)
+
+
+@pytest.mark.parametrize("reached, extended", [("tailscale", False), ("tcp", True), ("banner", True)])
+def test_wait_is_extended_only_once_sshd_answers(fleet, monkeypatch, reached, extended):
+    monkeypatch.setattr(probe, "probe", _stuck_at(reached))
+    monkeypatch.setattr(BootModel, "timeout", lambda self: 0.2)
+    monkeypatch.setattr(BootModel, "next_delay", lambda self, elapsed: 0.05)
+    monkeypatch.setattr(boottime, "EXTEND_TIMEOUT", 0.3)
+    monkeypatch.setattr(boottime, "MAX_TIMEOUT", 0.5)
+
+    with pytest.raises(typer.Exit):
+        cli._wait_for_device(Device(name="box", hostname="box"), cli.get_config())
+
+    assert load_boot_times("box") == []
+    (waited,) = load_timeouts("box")
+    assert (waited >= 0.4) == extended
@@ -0,0 +1,102 @@
+import signal
+import socket
+import subprocess
+import threading
+import time
+
+import httpx
+import pytest
+
+
+@pytest.mark.parametrize("body", ["[]", "null", "42", '"wake"', "{"])
+@pytest.mark.parametrize("path", ["/wake", "/ready", "/status", "/notify"])
+def test_post_rejects_body_that_is_not_an_object(webhook, path, body):
+    response = httpx.post(webhook + path, content=body)
+    assert response.status_code == 400
+    assert response.json() == {"error": "invalid json"}
+
+
+def test_post_without_body_is_an_empty_object(webhook):
+    response = httpx.post(webhook + "/wake")
+    assert response.status_code == 400
+    assert response.json() == {"error": "device required"}
+
+
+def test_dry_run_wake(webhook):
+    response = httpx.post(webhook + "/wake", json={"device": "host-001"})
+    assert response.status_code == 200
+    assert response.json()["ok"] is True
+
+
+def test_status_is_not_queued_behind_slow_wakes(make_webhook):
+    server = make_webhook(action_workers=1)
+    release = threading.Event()
+
+    def stuck_wake(device, config, on_phase=None):
+        release.wait(10)
+        return {"ok": True}
+
+    server.wake_action = stuck_wake
+    try:
+        for _ in range(3):
+            response = httpx.post(server.url + "/wake", json={"device": "host-001", "async": True})
+            assert response.status_code == 202
+        start = time.monotonic()
+        response = httpx.post(server.url + "/status", json={})
+        assert response.status_code == 200
+        assert time.monotonic() - start < 2
+        assert {d["name"] for d in response.json()["devices"]} >= {"host-000", "host-001"}
+    finally:
+        release.set()
+
+
+def test_server_close_ends_event_streams(make_webhook):
+    server = make_webhook()
+    lines = []
+
+    def listen():
+        with httpx.stream("GET", server.url + "/events", timeout=30) as response:
+            lines.extend(response.iter_lines())
+
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    _wait_for(lambda: server.presence._subscribers)
+    server.shutdown()
+    server.server_close()
+    listener.join(5)
+    assert not listener.is_alive()
+    assert any(line.startswith("event: ") for line in lines)
+
+
+def test_serve_exits_with_an_open_event_stream(fleet):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    serve = subprocess.Popen(
+        fleet.tc("serve", "--dry-run", "--port", str(port)),
+        cwd=fleet.root,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}"
+        _wait_for(lambda: _healthy(url))
+        with httpx.stream("GET", url + "/events", timeout=30) as response:
+            assert response.status_code == 200
+            serve.send_signal(signal.SIGINT)
+            assert serve.wait(5) is not None
+    finally:
+        serve.kill()
+
+
+def _healthy(url: str) -> bool:
+    try:
+        return httpx.get(url + "/health").status_code == 200
+    except httpx.HTTPError:
+        return False
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)